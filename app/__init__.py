@@ -1,25 +1,36 @@
+import os
+import sqlite3
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_mail import Mail
+from sqlalchemy import event
 from config import config
 
 db = SQLAlchemy()
-migrate = Migrate()
 login_manager = LoginManager()
-mail = Mail()
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    """Use write-ahead logging so readers (and online backups) never block writers"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
 
 def create_app(config_name='development'):
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # Load compiled templates from disk instead of recompiling them in every worker
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    app.jinja_options = {**app.jinja_options,
+                         'bytecode_cache': FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])}
+
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    if app.config['SQLITE_WAL']:
+        with app.app_context():
+            event.listen(db.engine, 'connect', _enable_sqlite_wal)
     login_manager.init_app(app)
-    mail.init_app(app)
 
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -38,4 +49,24 @@ def create_app(config_name='development'):
     app.register_blueprint(routes.bp)
     app.register_blueprint(auth, url_prefix='/auth')
 
+    # Request latency, error, pool and cache metrics
+    from app import metrics
+    metrics.init_app(app)
+
+    # Admin-only request profiling
+    from app import profiling
+    profiling.init_app(app)
+
+    # Throttle auth and mutation endpoints
+    from app import ratelimit
+    ratelimit.init_app(app)
+
+    # Fingerprinted static assets
+    from app import assets
+    assets.init_app(app)
+
+    # Compress HTML and JSON responses
+    from app import compression
+    compression.init_app(app)
+
     return app
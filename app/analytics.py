@@ -0,0 +1,179 @@
+"""Flow analytics: lane transition history and board metrics.
+
+Every time a card enters or leaves a lane a row is appended to
+``card_transitions`` and the matching ``lane_daily_flow`` counters are bumped
+with an upsert, so the daily aggregates are always current and never need
+to be rebuilt from history.  Board analytics are then computed from the
+aggregates with NumPy; only cycle-time percentiles read raw transitions,
+through an index range on the board's final lane.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import cast, func, insert, literal, select, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Lane, Card, CardTransition, LaneDailyFlow
+
+
+def _age_seconds(created_at, now):
+    """SQL expression for a card's age in whole seconds"""
+    return cast((func.julianday(literal(now)) - func.julianday(created_at)) * 86400, Integer)
+
+
+def _update_daily_flow(after_id):
+    """Fold transitions with an id above ``after_id`` into the daily aggregates"""
+    transitions = CardTransition.__table__
+    for lane_column, counter in ((transitions.c.to_lane_id, 'arrivals'),
+                                 (transitions.c.from_lane_id, 'departures')):
+        day = func.date(transitions.c.created_at)
+        rows = (select(transitions.c.board_id, day, lane_column, func.count())
+                .where(transitions.c.id > after_id, lane_column.isnot(None))
+                .group_by(transitions.c.board_id, day, lane_column))
+
+        stmt = sqlite_insert(LaneDailyFlow.__table__).from_select(
+            ['board_id', 'day', 'lane_id', counter], rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['board_id', 'day', 'lane_id'],
+            set_={counter: getattr(LaneDailyFlow.__table__.c, counter) + getattr(stmt.excluded, counter)}
+        )
+        db.session.execute(stmt)
+
+
+def _last_transition_id():
+    return db.session.execute(select(func.max(CardTransition.id))).scalar() or 0
+
+
+def record_transition(card, board_id, from_lane_id, to_lane_id):
+    """Record one card entering and/or leaving a lane (caller commits)"""
+    if from_lane_id == to_lane_id:
+        return
+
+    now = datetime.utcnow()
+    created_at = card.created_at or now
+    last_id = _last_transition_id()
+    db.session.execute(insert(CardTransition.__table__).values(
+        board_id=board_id,
+        card_id=card.id,
+        from_lane_id=from_lane_id,
+        to_lane_id=to_lane_id,
+        age_seconds=int((now - created_at).total_seconds()),
+        created_at=now
+    ))
+    _update_daily_flow(last_id)
+
+
+def record_lane_transitions(card_ids=None, lane_ids=None, arriving=True):
+    """Record arrivals (or departures) for many cards in set-based statements.
+
+    Cards are selected by id or by lane; the cards must still be in the
+    ``cards`` table, so record departures *before* deleting or archiving.
+    """
+    cards = Card.__table__
+    lanes = Lane.__table__
+    now = datetime.utcnow()
+
+    condition = cards.c.id.in_(card_ids) if card_ids is not None else cards.c.lane_id.in_(lane_ids)
+    lane_id = cards.c.lane_id
+    last_id = _last_transition_id()
+    db.session.execute(insert(CardTransition.__table__).from_select(
+        ['board_id', 'card_id', 'from_lane_id', 'to_lane_id', 'age_seconds', 'created_at'],
+        select(
+            lanes.c.board_id,
+            cards.c.id,
+            literal(None, Integer) if arriving else lane_id,
+            lane_id if arriving else literal(None, Integer),
+            _age_seconds(cards.c.created_at, now),
+            literal(now)
+        ).join(lanes, cards.c.lane_id == lanes.c.id)
+         .where(condition)
+    ))
+    _update_daily_flow(last_id)
+
+
+def record_card_moves(card_ids, to_lane_id):
+    """Record many cards moving into ``to_lane_id`` (caller commits).
+
+    Call before updating the cards' lanes; cards already in the lane are
+    skipped, as in ``record_transition``.
+    """
+    cards = Card.__table__
+    lanes = Lane.__table__
+    now = datetime.utcnow()
+
+    last_id = _last_transition_id()
+    db.session.execute(insert(CardTransition.__table__).from_select(
+        ['board_id', 'card_id', 'from_lane_id', 'to_lane_id', 'age_seconds', 'created_at'],
+        select(
+            lanes.c.board_id,
+            cards.c.id,
+            cards.c.lane_id,
+            literal(to_lane_id),
+            _age_seconds(cards.c.created_at, now),
+            literal(now)
+        ).join(lanes, lanes.c.id == to_lane_id)
+         .where(cards.c.id.in_(card_ids), cards.c.lane_id != to_lane_id)
+    ))
+    _update_daily_flow(last_id)
+
+
+def board_analytics(board, days=30):
+    """Cumulative flow, throughput and cycle-time percentiles for a board.
+
+    Daily lane counts are reconstructed backwards from today's lane sizes:
+    the count at the end of day ``d`` is the current count minus the net
+    flow recorded after ``d``.
+    """
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    day_list = [start + timedelta(days=offset) for offset in range(days)]
+
+    lanes = Lane.query.filter_by(board_id=board.id).order_by(Lane.position).all()
+    if not lanes:
+        return {'days': [d.isoformat() for d in day_list], 'lanes': [],
+                'done_lane_id': None, 'throughput': [0] * days, 'cycle_time_days': None}
+    lane_index = {lane.id: i for i, lane in enumerate(lanes)}
+    done_lane = lanes[-1]
+
+    current = np.zeros(len(lanes), dtype=np.int64)
+    for lane_id, count in db.session.execute(
+            select(Card.lane_id, func.count())
+            .where(Card.lane_id.in_(lane_index))
+            .group_by(Card.lane_id)):
+        current[lane_index[lane_id]] = count
+
+    net = np.zeros((len(lanes), days), dtype=np.int64)
+    arrivals = np.zeros((len(lanes), days), dtype=np.int64)
+    for lane_id, day, arrived, departed in db.session.execute(
+            select(LaneDailyFlow.lane_id, LaneDailyFlow.day,
+                   LaneDailyFlow.arrivals, LaneDailyFlow.departures)
+            .where(LaneDailyFlow.board_id == board.id, LaneDailyFlow.day >= start,
+                   LaneDailyFlow.lane_id.in_(lane_index))):
+        row, col = lane_index[lane_id], (day - start).days
+        net[row, col] = arrived - departed
+        arrivals[row, col] = arrived
+
+    # Flow after day d is the total net flow minus the cumulative flow up to d
+    flow_after = net.sum(axis=1, keepdims=True) - np.cumsum(net, axis=1)
+    counts = current[:, None] - flow_after
+
+    ages = np.fromiter(db.session.execute(
+        select(CardTransition.age_seconds)
+        .where(CardTransition.board_id == board.id,
+               CardTransition.to_lane_id == done_lane.id,
+               CardTransition.created_at >= datetime.combine(start, datetime.min.time()))
+    ).scalars(), dtype=np.float64)
+
+    cycle_time = None
+    if ages.size:
+        p50, p85, p95 = np.percentile(ages / 86400.0, [50, 85, 95])
+        cycle_time = {'count': int(ages.size), 'p50': round(float(p50), 2),
+                      'p85': round(float(p85), 2), 'p95': round(float(p95), 2)}
+
+    return {
+        'days': [d.isoformat() for d in day_list],
+        'lanes': [{'id': lane.id, 'title': lane.title, 'counts': counts[i].tolist()}
+                  for i, lane in enumerate(lanes)],
+        'done_lane_id': done_lane.id,
+        'throughput': arrivals[lane_index[done_lane.id]].tolist(),
+        'cycle_time_days': cycle_time
+    }
@@ -0,0 +1,133 @@
+"""Cold-storage archival of completed cards.
+
+Cards that have sat in an archive lane (``ARCHIVE_LANE_TITLES``, "Done" by
+default) for longer than ``ARCHIVE_AFTER_DAYS`` are moved out of the hot
+``cards`` table into ``archived_cards``.  The batch job works in
+keyset-ordered chunks and commits after each one, so it never holds the
+SQLite write lock for long.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select, update
+from app import db
+from app.models import Board, Lane, Card, Category, ArchivedCard, Attachment, card_categories
+from app.analytics import record_lane_transitions, record_transition
+from app.wip import insert_card
+
+
+def _archive_chunk(card_ids, now):
+    """Copy the given cards into the archive and remove them from the hot tables"""
+    cards = Card.__table__
+    lanes = Lane.__table__
+    category_ids = (select(func.group_concat(card_categories.c.category_id))
+                    .where(card_categories.c.card_id == cards.c.id)
+                    .scalar_subquery())
+
+    db.session.execute(insert(ArchivedCard.__table__).from_select(
+        ['card_id', 'board_id', 'lane_id', 'lane_title', 'title', 'description',
+         'position', 'due_date', 'category_ids', 'created_at', 'updated_at', 'archived_at'],
+        select(
+            cards.c.id,
+            lanes.c.board_id,
+            cards.c.lane_id,
+            lanes.c.title,
+            cards.c.title,
+            cards.c.description,
+            cards.c.position,
+            cards.c.due_date,
+            category_ids,
+            cards.c.created_at,
+            cards.c.updated_at,
+            literal(now)
+        ).join(lanes, cards.c.lane_id == lanes.c.id)
+         .where(cards.c.id.in_(card_ids))
+    ))
+    # Attachments follow their card into the archive, blobs and all
+    attachments = Attachment.__table__
+    archived_id = (select(func.max(ArchivedCard.id))
+                   .where(ArchivedCard.card_id == attachments.c.card_id)
+                   .scalar_subquery())
+    db.session.execute(update(attachments)
+                       .where(attachments.c.card_id.in_(card_ids))
+                       .values(archived_card_id=archived_id, card_id=None))
+    record_lane_transitions(card_ids=card_ids, arriving=False)
+    board_ids = db.session.execute(
+        select(lanes.c.board_id).distinct()
+        .join(cards, cards.c.lane_id == lanes.c.id)
+        .where(cards.c.id.in_(card_ids))
+    ).scalars().all()
+    if board_ids:
+        Board.bump_revision(*board_ids)
+    db.session.execute(delete(card_categories).where(card_categories.c.card_id.in_(card_ids)))
+    db.session.execute(delete(cards).where(cards.c.id.in_(card_ids)))
+
+
+def archive_cards(card_ids):
+    """Archive specific cards in one statement set (caller commits)"""
+    if card_ids:
+        _archive_chunk(list(card_ids), datetime.utcnow())
+    return len(card_ids)
+
+
+def archive_old_cards(max_age_days=None, chunk_size=None):
+    """Move cards older than the configured age out of archive lanes.
+
+    Returns the number of cards archived.
+    """
+    config = current_app.config
+    max_age_days = config['ARCHIVE_AFTER_DAYS'] if max_age_days is None else max_age_days
+    chunk_size = chunk_size or config['ARCHIVE_CHUNK_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+
+    lane_ids = db.session.execute(
+        select(Lane.id).where(Lane.title.in_(config['ARCHIVE_LANE_TITLES']))
+    ).scalars().all()
+    if not lane_ids:
+        return 0
+
+    total = 0
+    last_id = 0
+    while True:
+        card_ids = db.session.execute(
+            select(Card.id)
+            .where(Card.lane_id.in_(lane_ids), Card.updated_at < cutoff, Card.id > last_id)
+            .order_by(Card.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not card_ids:
+            break
+
+        _archive_chunk(card_ids, datetime.utcnow())
+        db.session.commit()
+
+        total += len(card_ids)
+        last_id = card_ids[-1]
+        current_app.logger.info(f"Archived {len(card_ids)} cards (up to id {last_id})")
+
+    return total
+
+
+def restore_card(archived, lane):
+    """Move an archived card back to the end of a lane (caller commits).
+
+    Raises WipLimitReached if the lane is full; the caller must then roll back.
+    """
+    card_id = insert_card(lane, archived.title, description=archived.description or '',
+                          created_at=archived.created_at, due_date=archived.due_date)
+
+    category_ids = archived.to_dict()['category_ids']
+    if category_ids:
+        # Categories deleted while the card was archived are simply dropped
+        db.session.execute(insert(card_categories).from_select(
+            ['card_id', 'category_id'],
+            select(literal(card_id), Category.id).where(Category.id.in_(category_ids))
+        ))
+
+    card = db.session.get(Card, card_id)
+    db.session.delete(archived)
+    db.session.flush()
+    db.session.execute(update(Attachment.__table__)
+                       .where(Attachment.archived_card_id == archived.id)
+                       .values(card_id=card.id, archived_card_id=None))
+    record_transition(card, lane.board_id, None, lane.id)
+    return card
@@ -0,0 +1,180 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask --app run build-assets`` copies every file listed in ``ASSET_FILES``
+into ``static/dist`` under a content-hashed name (``js/kanban.3f2a9c1b04de.js``)
+together with gzip and brotli variants, and records the mapping in ``dist/manifest.json``.  Third-party
+libraries listed in ``VENDOR_ASSETS`` are downloaded into ``static/vendor``
+first, so pages no longer depend on a CDN.
+
+Templates call ``asset_url('js/kanban.js')``.  With a manifest the URL points
+at the hashed file, served with an immutable one-year ``Cache-Control`` and
+the best encoding the client accepts; without one it falls back to the plain
+static file with a ``?v=`` content hash (or, for a vendored library that was
+never fetched, its CDN URL).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+import urllib.request
+from pathlib import Path
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt; build_assets() refuses to run without it
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+bp = Blueprint('assets', __name__)
+
+
+def _dist_dir(app):
+    return Path(app.static_folder) / 'dist'
+
+
+def _load_manifest(app):
+    path = _dist_dir(app) / MANIFEST_NAME
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    app.extensions['asset_manifest'] = manifest
+    # Reverse lookup so the serving route only exposes built files
+    app.extensions['asset_files'] = set(manifest.values())
+    return manifest
+
+
+def fetch_vendor_assets(app, force=False):
+    """Download missing third-party libraries into the static folder"""
+    static = Path(app.static_folder)
+    fetched = []
+    for name, source in app.config['VENDOR_ASSETS'].items():
+        target = static / name
+        if target.exists() and not force:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with urllib.request.urlopen(source, timeout=30) as response:
+                data = response.read()
+        except OSError as e:
+            # Pages keep loading the library from its CDN until it is vendored
+            app.logger.warning(f"Could not fetch {name} from {source}: {e}")
+            continue
+        target.write_bytes(data)
+        fetched.append(name)
+    return fetched
+
+
+class AssetBuildError(Exception):
+    """Raised when the assets cannot be built as configured"""
+
+
+def build_assets(app, gzip_only=False):
+    """Write hashed and precompressed copies of the assets plus the manifest.
+
+    Returns the manifest.  Missing source files are skipped with a warning.
+    Raises AssetBuildError if the brotli package is missing, rather than
+    quietly building without ``.br`` variants, unless ``gzip_only`` is set.
+    """
+    if brotli is None and not gzip_only:
+        raise AssetBuildError('The brotli package is not installed; run pip install -r requirements.txt '
+                              'or build gzip variants only with --gzip-only')
+    static = Path(app.static_folder)
+    dist = _dist_dir(app)
+    level = app.config['ASSET_COMPRESS_LEVEL']
+
+    # Rebuild from scratch so stale fingerprints don't accumulate
+    shutil.rmtree(dist, ignore_errors=True)
+    dist.mkdir(parents=True)
+
+    manifest = {}
+    for name in list(app.config['ASSET_FILES']) + list(app.config['VENDOR_ASSETS']):
+        source = static / name
+        if not source.exists():
+            app.logger.warning(f"Asset {name} not found, skipping")
+            continue
+
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, dot, suffix = name.rpartition('.')
+        hashed = f'{stem}.{digest}.{suffix}' if dot else f'{name}.{digest}'
+
+        target = dist / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        # mtime=0 keeps the gzip bytes reproducible between builds
+        target.with_name(target.name + '.gz').write_bytes(gzip.compress(data, compresslevel=level, mtime=0))
+        if not gzip_only:
+            target.with_name(target.name + '.br').write_bytes(brotli.compress(data, quality=11))
+
+        manifest[name] = hashed
+
+    with open(dist / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    _load_manifest(app)
+    return manifest
+
+
+def asset_url(name):
+    """URL for a static asset, fingerprinted when a build is available"""
+    app = current_app
+    hashed = app.extensions.get('asset_manifest', {}).get(name)
+    if hashed:
+        return url_for('assets.serve', filename=hashed)
+
+    source = Path(app.static_folder) / name
+    if name in app.config['VENDOR_ASSETS'] and not source.exists():
+        return app.config['VENDOR_ASSETS'][name]
+    return url_for('static', filename=name, v=_source_version(app, source))
+
+
+def _source_version(app, source):
+    """Content hash of an unbuilt asset, so browsers refetch it when it changes"""
+    try:
+        mtime = source.stat().st_mtime_ns
+    except OSError:
+        return None
+    versions = app.extensions.setdefault('asset_versions', {})
+    cached = versions.get(source)
+    if cached is None or cached[0] != mtime:
+        cached = versions[source] = (mtime, hashlib.sha256(source.read_bytes()).hexdigest()[:12])
+    return cached[1]
+
+
+@bp.route('/assets/<path:filename>')
+def serve(filename):
+    """Serve a fingerprinted asset, precompressed when the client allows it"""
+    if filename not in current_app.extensions.get('asset_files', ()):
+        abort(404)
+
+    path = _dist_dir(current_app) / filename
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in ENCODINGS:
+        variant = path.with_name(path.name + suffix)
+        if request.accept_encodings[candidate] and variant.exists():
+            path, encoding = variant, candidate
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    # The file on disk may be the .br/.gz variant; don't advertise that name
+    response.headers.pop('Content-Disposition', None)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Register the asset route and the ``asset_url`` template global"""
+    app.register_blueprint(bp)
+    app.add_template_global(asset_url)
+    _load_manifest(app)
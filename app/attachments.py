@@ -0,0 +1,219 @@
+"""Card attachments stored as content-addressed blobs.
+
+Uploads are streamed from the request body to a temporary file in
+``ATTACHMENT_CHUNK_SIZE`` chunks, hashed on the way, and then renamed to
+``ATTACHMENT_DIR/ab/cd/<sha256>``.  Identical files are stored once: each
+``attachments`` row names its blob, and a blob is deleted when the last row
+naming it goes.
+
+Adding and collecting blobs both happen while the transaction holds the
+SQLite write lock -- an upload flushes its row before the blob appears, and
+garbage collection runs after the rows were deleted but before the commit --
+so a concurrent upload of the same content can never lose its blob.
+
+Downloads honour single ``Range`` requests.  Anything read to the end of the
+file goes through the server's ``wsgi.file_wrapper``, which gunicorn serves
+with ``sendfile()`` from the current file offset without copying the data
+through Python.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+from flask import Response, current_app, request
+from sqlalchemy import select
+from werkzeug.datastructures import ContentRange
+from werkzeug.wsgi import wrap_file
+from app import db
+from app.models import Attachment
+
+TEMP_MAX_AGE = 3600  # Seconds before an abandoned upload's temporary file is swept
+
+
+class AttachmentTooLarge(Exception):
+    """Raised when an upload exceeds ATTACHMENT_MAX_SIZE"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        super().__init__(f'Attachments are limited to {max_size // (1024 * 1024)} MB')
+
+
+def _root():
+    return Path(current_app.config['ATTACHMENT_DIR'])
+
+
+def blob_path(sha256):
+    """Where the blob with this digest lives"""
+    return _root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def _receive(stream):
+    """Copy a request body to a temporary file; returns (sha256, size, path)"""
+    config = current_app.config
+    temp_dir = _root() / 'tmp'
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while chunk := stream.read(config['ATTACHMENT_CHUNK_SIZE']):
+                size += len(chunk)
+                if size > config['ATTACHMENT_MAX_SIZE']:
+                    raise AttachmentTooLarge(config['ATTACHMENT_MAX_SIZE'])
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return digest.hexdigest(), size, temp_path
+
+
+def add_attachment(card, filename, content_type, stream):
+    """Store an uploaded file and attach it to a card (caller commits)"""
+    sha256, size, temp_path = _receive(stream)
+    try:
+        attachment = Attachment(card_id=card.id, filename=filename, content_type=content_type,
+                                size=size, sha256=sha256)
+        db.session.add(attachment)
+        # Take the write lock before the blob becomes visible (see collect_garbage)
+        db.session.flush()
+
+        path = blob_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return attachment
+
+
+def attachment_hashes(card_ids=None, archived_card_ids=None):
+    """Blob digests used by the attachments of the given cards or archived cards.
+
+    The ids may be lists or selects.
+    """
+    column = Attachment.card_id if card_ids is not None else Attachment.archived_card_id
+    ids = card_ids if card_ids is not None else archived_card_ids
+    return set(db.session.execute(
+        select(Attachment.sha256).distinct().where(column.in_(ids))
+    ).scalars())
+
+
+def collect_garbage(hashes):
+    """Delete the blobs among ``hashes`` that no attachment names any more.
+
+    Call after deleting attachment rows and right before committing: the
+    deletes hold the write lock, so no upload can claim a blob between the
+    check and the unlink.  Returns the number of blobs removed.
+    """
+    hashes = set(hashes)
+    if not hashes:
+        return 0
+    referenced = set(db.session.execute(
+        select(Attachment.sha256).distinct().where(Attachment.sha256.in_(hashes))
+    ).scalars())
+
+    removed = 0
+    for sha256 in hashes - referenced:
+        try:
+            blob_path(sha256).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def sweep_blobs(now=None):
+    """Remove every unreferenced blob and abandoned temporary upload.
+
+    Returns ``{'blobs_removed': n, 'temp_files_removed': m}``.
+    """
+    now = now or time.time()
+    root = _root()
+    temp_files_removed = 0
+    for path in (root / 'tmp').glob('*'):
+        if now - path.stat().st_mtime > TEMP_MAX_AGE:
+            path.unlink(missing_ok=True)
+            temp_files_removed += 1
+
+    db.session.commit()
+    if db.engine.dialect.name == 'sqlite':
+        # Hold the write lock for the whole sweep, as a delete would
+        db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+    on_disk = {path.name for path in root.glob('??/??/*')}
+    blobs_removed = collect_garbage(on_disk)
+    db.session.commit()
+    return {'blobs_removed': blobs_removed, 'temp_files_removed': temp_files_removed}
+
+
+def _read_range(f, length, chunk_size):
+    """Yield ``length`` bytes from the file's current offset, then close it"""
+    try:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _content_disposition(filename):
+    ascii_name = filename.encode('ascii', 'ignore').decode().replace('"', '').replace('\\', '') or 'download'
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def attachment_response(attachment):
+    """Serve an attachment, honouring If-None-Match, If-Range and a single Range"""
+    etag = attachment.sha256
+    response = Response(mimetype=attachment.content_type)
+    response.set_etag(etag)
+    response.accept_ranges = 'bytes'
+    response.headers['Content-Disposition'] = _content_disposition(attachment.filename)
+    # Never render uploads inline, and keep the compression middleware's hands off
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.cache_control.private = True
+    response.cache_control.no_transform = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+
+    try:
+        f = open(blob_path(attachment.sha256), 'rb')
+    except FileNotFoundError:
+        current_app.logger.error(f'Blob {attachment.sha256} of attachment {attachment.id} is missing')
+        return Response('Attachment content is missing', 404)
+
+    size = attachment.size
+    start, stop = 0, size
+    byte_range = request.range
+    if (request.if_range.etag or request.if_range.date) and request.if_range.etag != etag:
+        byte_range = None  # The client's partial copy is of other content: send it all
+    if byte_range and len(byte_range.ranges) == 1:
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            f.close()
+            response.status_code = 416
+            response.content_range = ContentRange('bytes', None, None, size)
+            return response
+        start, stop = bounds
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, stop, size)
+
+    f.seek(start)
+    if stop == size:
+        response.response = wrap_file(request.environ, f, current_app.config['ATTACHMENT_CHUNK_SIZE'])
+    else:
+        response.response = _read_range(f, stop - start, current_app.config['ATTACHMENT_CHUNK_SIZE'])
+    response.direct_passthrough = True
+    response.content_length = stop - start
+    return response
@@ -1,9 +1,10 @@
+from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.passwords import HashingBusy
 from app.email import send_verification_email, generate_confirmation_token, confirm_token
-from email_validator import validate_email, EmailNotValidError
 
 auth = Blueprint('auth', __name__)
 
@@ -28,6 +29,8 @@ def register():
         if not email:
             errors.append('Email is required.')
         else:
+            # Only registration needs email_validator; keep it out of worker startup
+            from email_validator import validate_email, EmailNotValidError
             try:
                 # Validate email format
                 valid = validate_email(email)
@@ -55,8 +58,13 @@ def register():
 
         # Create new user
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'warning')
+            return render_template('auth/register.html'), 503, {'Retry-After': '5'}
         user.verification_token = generate_confirmation_token(email)
+        user.verification_sent_at = datetime.utcnow()
 
         db.session.add(user)
         db.session.commit()
@@ -111,7 +119,13 @@ def login():
 
         user = User.query.filter_by(username=username).first()
 
-        if not user or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'warning')
+            return render_template('auth/login.html'), 503, {'Retry-After': '5'}
+
+        if not valid:
             flash('Invalid username or password.', 'danger')
             return render_template('auth/login.html')
 
@@ -119,6 +133,14 @@ def login():
             flash('Please verify your email address before logging in.', 'warning')
             return render_template('auth/login.html')
 
+        if user.password_needs_rehash():
+            # The KDF settings changed since this hash was made; upgrade it while we have the password
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except HashingBusy:
+                pass  # Try again on the next login
+
         login_user(user, remember=remember)
         flash(f'Welcome back, {user.username}!', 'success')
 
@@ -147,6 +169,7 @@ def resend_verification():
 
         if user and not user.is_verified:
             user.verification_token = generate_confirmation_token(email)
+            user.verification_sent_at = datetime.utcnow()
             db.session.commit()
 
             verification_url = url_for('auth.verify_email', token=user.verification_token, _external=True)
@@ -0,0 +1,211 @@
+"""Online backups of the SQLite database.
+
+Backups use SQLite's online backup API, copying ``BACKUP_PAGES_PER_STEP``
+pages at a time and pausing ``BACKUP_STEP_SLEEP`` seconds between steps.
+In WAL mode (``SQLITE_WAL``) the copy runs inside one read transaction, so
+it sees a single consistent snapshot while writers carry on appending to
+the log.  With a rollback journal a write from another connection restarts
+the copy instead; after ``BACKUP_MAX_RESTARTS`` restarts the backup gives up.
+
+Each snapshot is integrity-checked, gzip-compressed to
+``kanban-<timestamp>.db.gz`` in ``BACKUP_DIR`` next to a ``.sha256`` file in
+``sha256sum`` format, and only the newest ``BACKUP_RETAIN`` are kept.  The
+timestamp runs to the microsecond and each name is claimed exclusively, so
+backups started together never write to the same archive.
+Restoring verifies the checksum and the database integrity before copying
+the snapshot into the live database, again through the backup API.
+"""
+from datetime import datetime
+import gzip
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import sqlite3
+import tempfile
+import time
+from flask import current_app
+from app import db
+
+BACKUP_PREFIX = 'kanban-'
+BACKUP_SUFFIX = '.db.gz'
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be made or fails verification"""
+
+
+def database_path():
+    """Filesystem path of the configured SQLite database"""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        raise BackupError('Backups are only supported for file-based SQLite databases')
+    return Path(url.database)
+
+
+def _copy(source, target, pages, pause, max_restarts=None):
+    """Copy one SQLite database into another in page steps"""
+    last_remaining = None
+    restarts = 0
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining, restarts
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1  # Another connection wrote to the source mid-copy
+            if max_restarts is not None and restarts > max_restarts:
+                raise BackupError(f'Backup restarted {restarts} times by concurrent writes')
+        last_remaining = remaining
+        if remaining:
+            time.sleep(pause)  # Let writers in between steps
+
+    source.backup(target, pages=pages, progress=progress)
+
+
+def _pin_snapshot(conn):
+    """In WAL mode, hold a read transaction so the copy sees one snapshot"""
+    if conn.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+        return False
+    conn.execute('BEGIN')
+    conn.execute('SELECT count(*) FROM sqlite_master').fetchone()
+    return True
+
+
+def _check_integrity(conn):
+    result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed: {result}')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_backups(backup_dir=None):
+    """Backup archives, newest first"""
+    backup_dir = Path(backup_dir or current_app.config['BACKUP_DIR'])
+    if not backup_dir.is_dir():
+        return []
+    return sorted(backup_dir.glob(f'{BACKUP_PREFIX}*{BACKUP_SUFFIX}'), reverse=True)
+
+
+def _rotate(backup_dir, retain):
+    removed = []
+    for archive in list_backups(backup_dir)[retain:]:
+        archive.unlink()
+        Path(f'{archive}.sha256').unlink(missing_ok=True)
+        removed.append(archive)
+    return removed
+
+
+def _reserve_archive(backup_dir):
+    """Pick an unused archive name and claim its partial file; returns both paths"""
+    while True:
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+        archive = backup_dir / f'{BACKUP_PREFIX}{stamp}{BACKUP_SUFFIX}'
+        partial = archive.with_name(archive.name + '.part')
+        if archive.exists():
+            continue
+        try:
+            # O_EXCL: a second backup started in the same microsecond gets the next stamp
+            os.close(os.open(partial, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return archive, partial
+
+
+def create_backup(backup_dir=None):
+    """Snapshot, verify, compress and checksum the database; returns the archive path"""
+    config = current_app.config
+    backup_dir = Path(backup_dir or config['BACKUP_DIR'])
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.monotonic()
+    archive, partial = _reserve_archive(backup_dir)
+
+    fd, snapshot = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(database_path(), isolation_level=None)
+        target = sqlite3.connect(snapshot)
+        try:
+            pinned = _pin_snapshot(source)
+            _copy(source, target, config['BACKUP_PAGES_PER_STEP'], config['BACKUP_STEP_SLEEP'],
+                  config['BACKUP_MAX_RESTARTS'])
+            if pinned:
+                source.execute('COMMIT')
+            # A self-contained file: restoring it must not depend on a -wal file
+            target.execute('PRAGMA journal_mode=DELETE')
+            _check_integrity(target)
+        finally:
+            target.close()
+            source.close()
+
+        # Write under the partial name so a half-written archive never looks complete
+        with open(snapshot, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial, archive)
+    finally:
+        os.remove(snapshot)
+        partial.unlink(missing_ok=True)
+
+    with open(f'{archive}.sha256', 'w') as f:
+        f.write(f'{_sha256(archive)}  {archive.name}\n')
+
+    removed = _rotate(backup_dir, config['BACKUP_RETAIN'])
+    current_app.logger.info(f"Backup {archive.name} written in {time.monotonic() - started:.1f}s"
+                            f"{f', removed {len(removed)} old backups' if removed else ''}")
+    return archive
+
+
+def verify_backup(archive):
+    """Check an archive's checksum and decompress it to a temporary, integrity-checked database.
+
+    Returns the path of the decompressed copy; the caller removes it.
+    """
+    archive = Path(archive)
+    checksum_file = Path(f'{archive}.sha256')
+    if not checksum_file.exists():
+        raise BackupError(f'Missing checksum file {checksum_file.name}')
+    expected = checksum_file.read_text().split()[0]
+    if _sha256(archive) != expected:
+        raise BackupError(f'Checksum mismatch for {archive.name}')
+
+    fd, restored = tempfile.mkstemp(suffix='.db', dir=database_path().parent)
+    os.close(fd)
+    try:
+        with gzip.open(archive, 'rb') as src, open(restored, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        conn = sqlite3.connect(restored)
+        try:
+            _check_integrity(conn)
+        finally:
+            conn.close()
+    except Exception:
+        os.remove(restored)
+        raise
+    return restored
+
+
+def restore_backup(archive):
+    """Replace the live database's contents with a verified backup"""
+    config = current_app.config
+    restored = verify_backup(archive)
+    try:
+        db.session.remove()
+        db.engine.dispose()  # Drop pooled connections holding the old schema
+
+        source = sqlite3.connect(restored)
+        target = sqlite3.connect(database_path())
+        try:
+            _copy(source, target, config['BACKUP_PAGES_PER_STEP'], 0)
+            _check_integrity(target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        os.remove(restored)
+    current_app.logger.info(f"Restored database from {Path(archive).name}")
@@ -0,0 +1,104 @@
+"""Operations on many selected cards at once.
+
+Each operation is a handful of set-based statements whatever the number of
+cards, and the caller commits them as one transaction: a bulk request either
+applies to every selected card or to none.
+"""
+from datetime import datetime
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Board, Lane, Card, Category, Attachment, card_categories
+from app.analytics import record_card_moves, record_lane_transitions
+from app.archive import archive_cards
+from app.attachments import attachment_hashes, collect_garbage
+from app.wip import WipLimitReached
+
+CATEGORY_MODES = ('set', 'add', 'remove')
+
+
+def card_owners(card_ids):
+    """Map each existing card id to ``(board_id, owner user_id)`` in one query"""
+    cards = Card.__table__
+    lanes = Lane.__table__
+    boards = Board.__table__
+    rows = db.session.execute(
+        select(cards.c.id, boards.c.id, boards.c.user_id)
+        .join(lanes, cards.c.lane_id == lanes.c.id)
+        .join(boards, lanes.c.board_id == boards.c.id)
+        .where(cards.c.id.in_(card_ids))
+    )
+    return {card_id: (board_id, user_id) for card_id, board_id, user_id in rows}
+
+
+def bulk_move(card_ids, lane):
+    """Move cards to the end of ``lane``, keeping the order of ``card_ids``.
+
+    Raises WipLimitReached if the cards don't all fit under the lane's WIP
+    limit; the caller must then roll back.
+    """
+    cards = Card.__table__
+    lanes = Lane.__table__
+    record_card_moves(card_ids, lane.id)
+
+    last_position = (select(func.coalesce(func.max(cards.c.position), 0))
+                     .where(cards.c.lane_id == lane.id, cards.c.id.notin_(card_ids))
+                     .scalar_subquery())
+    ordinal = case({card_id: i for i, card_id in enumerate(card_ids, start=1)}, value=cards.c.id)
+    db.session.execute(
+        update(cards)
+        .where(cards.c.id.in_(card_ids))
+        .values(lane_id=lane.id, position=last_position + ordinal, updated_at=datetime.utcnow(),
+                version=cards.c.version + 1)
+    )
+
+    # The UPDATE holds the write lock, so this count can't race other writers
+    card_count = select(func.count()).select_from(cards).where(cards.c.lane_id == lane.id).scalar_subquery()
+    over_limit = db.session.execute(
+        select(lanes.c.wip_limit.isnot(None) & (card_count > lanes.c.wip_limit))
+        .where(lanes.c.id == lane.id)
+    ).scalar()
+    if over_limit:
+        raise WipLimitReached(lane)
+
+
+def bulk_set_categories(card_ids, category_ids, mode='set'):
+    """Replace, add or remove categories on cards (``mode`` in CATEGORY_MODES)"""
+    cards = Card.__table__
+    categories = Category.__table__
+
+    if mode in ('set', 'remove'):
+        stmt = delete(card_categories).where(card_categories.c.card_id.in_(card_ids))
+        if mode == 'remove':
+            stmt = stmt.where(card_categories.c.category_id.in_(category_ids))
+        db.session.execute(stmt)
+
+    if mode in ('set', 'add') and category_ids:
+        # Joining against categories drops ids that no longer exist
+        pairs = (select(cards.c.id, categories.c.id)
+                 .join(categories, categories.c.id.in_(category_ids))
+                 .where(cards.c.id.in_(card_ids)))
+        db.session.execute(
+            sqlite_insert(card_categories)
+            .from_select(['card_id', 'category_id'], pairs)
+            .on_conflict_do_nothing()
+        )
+
+    db.session.execute(update(cards).where(cards.c.id.in_(card_ids))
+                       .values(updated_at=datetime.utcnow(), version=cards.c.version + 1))
+
+
+def bulk_delete(card_ids):
+    """Delete cards, their category links and attachments, and unused blobs"""
+    cards = Card.__table__
+    record_lane_transitions(card_ids=card_ids, arriving=False)
+    hashes = attachment_hashes(card_ids=card_ids)
+    db.session.execute(delete(Attachment.__table__).where(Attachment.card_id.in_(card_ids)))
+    db.session.execute(delete(card_categories).where(card_categories.c.card_id.in_(card_ids)))
+    db.session.execute(delete(cards).where(cards.c.id.in_(card_ids)))
+    collect_garbage(hashes)
+
+
+def bulk_archive(card_ids):
+    """Move cards into cold storage (see ``app.archive``)"""
+    archive_cards(card_ids)
@@ -0,0 +1,62 @@
+"""Small in-process caches.
+
+Each worker process keeps its own bounded LRU caches.  Entries are keyed by
+something that changes whenever the underlying data does (a board revision,
+a digest of a card's text), so they never need explicit invalidation; stale
+keys simply age out of the LRU.  Keys must never rely on a row id alone:
+SQLite reuses the ids of deleted rows.
+"""
+from collections import OrderedDict
+import threading
+
+# Every cache created through LRUCache, by name, so hit ratios can be reported
+caches = {}
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, name, maxsize=1024):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,56 @@
+"""Cleanup of expired verification tokens and abandoned sign-ups.
+
+A verification link is useless once ``TOKEN_EXPIRATION`` has passed, so the
+job clears those tokens; accounts that are still unverified
+``UNVERIFIED_ACCOUNT_DAYS`` after their last link expired are deleted,
+unless they somehow own boards.  Both steps are range scans on
+``(is_verified, verification_sent_at)`` and run in chunks of
+``CLEANUP_CHUNK_SIZE`` rows, committing after each chunk.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, exists, select, update
+from app import db
+from app.email import TOKEN_EXPIRATION
+from app.models import Board, User
+
+
+def _in_chunks(statement_for, chunk_size):
+    """Run statement_for(id subquery) until it affects fewer rows than a chunk"""
+    total = 0
+    while True:
+        count = db.session.execute(statement_for(chunk_size),
+                                   execution_options={'synchronize_session': False}).rowcount
+        db.session.commit()
+        total += count
+        if count < chunk_size:
+            return total
+
+
+def cleanup_unverified_users(chunk_size=None, now=None):
+    """Clear expired tokens and delete stale unverified accounts.
+
+    Returns ``{'tokens_cleared': n, 'users_deleted': m}``.
+    """
+    config = current_app.config
+    chunk_size = chunk_size or config['CLEANUP_CHUNK_SIZE']
+    now = now or datetime.utcnow()
+    token_cutoff = now - timedelta(seconds=TOKEN_EXPIRATION)
+    account_cutoff = token_cutoff - timedelta(days=config['UNVERIFIED_ACCOUNT_DAYS'])
+
+    def stale(cutoff, limit):
+        return (select(User.id)
+                .where(User.is_verified == False, User.verification_sent_at < cutoff)
+                .limit(limit))
+
+    users_deleted = _in_chunks(lambda limit: delete(User).where(User.id.in_(
+        stale(account_cutoff, limit).where(~exists().where(Board.user_id == User.id))
+    )), chunk_size)
+
+    tokens_cleared = _in_chunks(lambda limit: update(User).where(User.id.in_(
+        stale(token_cutoff, limit).where(User.verification_token.isnot(None))
+    )).values(verification_token=None), chunk_size)
+
+    current_app.logger.info(f"Cleared {tokens_cleared} expired verification tokens, "
+                            f"deleted {users_deleted} unverified accounts")
+    return {'tokens_cleared': tokens_cleared, 'users_deleted': users_deleted}
@@ -0,0 +1,117 @@
+"""Server-side board cloning.
+
+Lanes, cards, category links and attachments are copied with set-based
+``INSERT ... SELECT`` statements, so cloning a large board never loads the
+source rows into Python objects.  New primary keys are derived from the
+source keys plus a fixed offset, which lets each statement map parent ids
+(lane -> card -> category link) without a lookup table.  Attachments are
+content-addressed, so their copies share the source's blobs.
+"""
+from datetime import datetime
+from sqlalchemy import func, insert, literal, select
+from app import db
+from app.models import Board, Lane, Card, Attachment, card_categories
+from app.analytics import record_lane_transitions
+
+
+def _id_offset(table, source_ids):
+    """Offset that moves the source id range just past the table's current max id"""
+    max_id = db.session.execute(select(func.max(table.c.id))).scalar()
+    min_source_id = db.session.execute(select(func.min(source_ids.c.id))).scalar()
+    if min_source_id is None:
+        return None
+    return max_id - min_source_id + 1
+
+
+def clone_board(source, name, user_id, description=None, color=None, is_template=False):
+    """Copy a board with its lanes, cards, category links and attachments.
+
+    The new board is flushed but not committed, so the caller decides the
+    transaction boundary.  Flushing the board first also takes SQLite's write
+    lock before the id offsets are computed, so concurrent inserts cannot
+    claim the ids this clone is about to use.
+    """
+    board = Board(
+        name=name,
+        description=source.description if description is None else description,
+        color=color or source.color,
+        user_id=user_id,
+        is_template=is_template
+    )
+    db.session.add(board)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    lanes = Lane.__table__
+    cards = Card.__table__
+
+    source_lanes = select(lanes.c.id).where(lanes.c.board_id == source.id).subquery()
+    lane_offset = _id_offset(lanes, source_lanes)
+    if lane_offset is None:
+        return board
+
+    db.session.execute(insert(lanes).from_select(
+        ['id', 'title', 'position', 'wip_limit', 'board_id', 'created_at', 'updated_at'],
+        select(
+            lanes.c.id + lane_offset,
+            lanes.c.title,
+            lanes.c.position,
+            lanes.c.wip_limit,
+            literal(board.id),
+            literal(now),
+            literal(now)
+        ).where(lanes.c.board_id == source.id)
+    ))
+
+    source_cards = (select(cards.c.id)
+                    .join(lanes, cards.c.lane_id == lanes.c.id)
+                    .where(lanes.c.board_id == source.id)
+                    .subquery())
+    card_offset = _id_offset(cards, source_cards)
+    if card_offset is None:
+        return board
+
+    db.session.execute(insert(cards).from_select(
+        ['id', 'title', 'description', 'lane_id', 'user_id', 'position', 'created_at', 'updated_at'],
+        select(
+            cards.c.id + card_offset,
+            cards.c.title,
+            cards.c.description,
+            cards.c.lane_id + lane_offset,
+            literal(user_id),
+            cards.c.position,
+            literal(now),
+            literal(now)
+        ).join(lanes, cards.c.lane_id == lanes.c.id)
+         .where(lanes.c.board_id == source.id)
+    ))
+
+    db.session.execute(insert(card_categories).from_select(
+        ['card_id', 'category_id'],
+        select(
+            card_categories.c.card_id + card_offset,
+            card_categories.c.category_id
+        ).join(cards, card_categories.c.card_id == cards.c.id)
+         .join(lanes, cards.c.lane_id == lanes.c.id)
+         .where(lanes.c.board_id == source.id)
+    ))
+
+    attachments = Attachment.__table__
+    db.session.execute(insert(attachments).from_select(
+        ['card_id', 'filename', 'content_type', 'size', 'sha256', 'created_at'],
+        select(
+            attachments.c.card_id + card_offset,
+            attachments.c.filename,
+            attachments.c.content_type,
+            attachments.c.size,
+            attachments.c.sha256,
+            literal(now)
+        ).join(cards, attachments.c.card_id == cards.c.id)
+         .join(lanes, cards.c.lane_id == lanes.c.id)
+         .where(lanes.c.board_id == source.id)
+    ))
+
+    # The copies count as arrivals in their new lanes for flow analytics
+    record_lane_transitions(lane_ids=select(lanes.c.id).where(lanes.c.board_id == board.id))
+
+    return board
@@ -0,0 +1,153 @@
+"""Response compression middleware.
+
+Wraps the WSGI app and compresses text responses (HTML, JSON, CSS, JS) with
+brotli or gzip, whichever the client prefers.  The decision is made from the
+response headers alone, so the body is never buffered: each chunk of a
+streamed or generator response is compressed and flushed as it is produced.
+Responses that are already encoded (such as precompressed assets), smaller
+than ``COMPRESS_MIN_SIZE`` or marked ``no-transform`` pass through untouched.
+"""
+import zlib
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt, but fall back to gzip if it is missing
+    brotli = None
+
+SKIP_STATUSES = {204, 206, 304}
+
+
+class _GzipEncoder:
+    def __init__(self, level):
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush):
+        out = self._compressor.compress(data)
+        if flush:
+            out += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data, flush):
+        out = self._compressor.process(data)
+        if flush:
+            out += self._compressor.flush()
+        return out
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _CompressedBody:
+    """Iterable that compresses the wrapped body chunk by chunk"""
+
+    def __init__(self, body, encoder, streaming):
+        self._body = body
+        self._encoder = encoder
+        # Flushing every chunk keeps streamed output flowing at some cost in ratio
+        self._streaming = streaming
+
+    def __iter__(self):
+        for chunk in self._body:
+            data = self._encoder.compress(chunk, self._streaming)
+            if data:
+                yield data
+        yield self._encoder.finish()
+
+    def close(self):
+        if hasattr(self._body, 'close'):
+            self._body.close()
+
+
+class CompressionMiddleware:
+    """WSGI middleware negotiating brotli/gzip response compression"""
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+
+    def _choose_encoding(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        best, best_quality = None, 0
+        for name in self.app.config['COMPRESS_ALGORITHMS']:
+            if name == 'br' and brotli is None:
+                continue
+            quality = accepted[name]
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def _compressible(self, environ, status, headers):
+        config = self.app.config
+        if environ['REQUEST_METHOD'] == 'HEAD' or int(status.split(' ', 1)[0]) in SKIP_STATUSES:
+            return False
+        if 'content-encoding' in headers or 'content-range' in headers:
+            return False
+        if 'no-transform' in headers.get('cache-control', ''):
+            return False
+
+        mimetype = headers.get('content-type', '').split(';', 1)[0].strip()
+        if mimetype not in config['COMPRESS_MIMETYPES']:
+            return False
+
+        length = headers.get('content-length')
+        return length is None or int(length) >= config['COMPRESS_MIN_SIZE']
+
+    def __call__(self, environ, start_response):
+        state = {}
+
+        def _start_response(status, response_headers, exc_info=None):
+            headers = {name.lower(): value for name, value in response_headers}
+            if not self._compressible(environ, status, headers):
+                return start_response(status, response_headers, exc_info)
+
+            encoding = self._choose_encoding(environ)
+            vary = headers.get('vary', '')
+            if 'accept-encoding' not in vary.lower():
+                vary = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+            response_headers = [(name, value) for name, value in response_headers
+                                if name.lower() != 'vary']
+            response_headers.append(('Vary', vary))
+
+            if encoding is None:
+                return start_response(status, response_headers, exc_info)
+
+            config = self.app.config
+            if encoding == 'br':
+                encoder = _BrotliEncoder(config['COMPRESS_BR_LEVEL'])
+            else:
+                encoder = _GzipEncoder(config['COMPRESS_LEVEL'])
+            state['encoder'] = encoder
+            state['streaming'] = 'content-length' not in headers
+
+            response_headers = [(name, value) for name, value in response_headers
+                                if name.lower() not in ('content-length', 'etag')]
+            response_headers.append(('Content-Encoding', encoding))
+            if 'etag' in headers:
+                # The encoded body differs byte-for-byte, so the validator must be weak
+                etag = headers['etag']
+                response_headers.append(('ETag', etag if etag.startswith('W/') else f'W/{etag}'))
+            write = start_response(status, response_headers, exc_info)
+
+            def compressed_write(data):
+                write(encoder.compress(data, True))
+            return compressed_write
+
+        body = self.wsgi_app(environ, _start_response)
+        if 'encoder' not in state:
+            return body
+        return _CompressedBody(body, state['encoder'], state['streaming'])
+
+
+def init_app(app):
+    """Install the compression middleware around the application"""
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, app)
@@ -0,0 +1,42 @@
+"""Optimistic concurrency control for boards, lanes and cards.
+
+Each of these rows carries a ``version`` counter (SQLAlchemy's
+``version_id_col``): every ORM flush that updates the row increments it and
+checks the old value in the ``WHERE`` clause, so a write based on a stale
+read fails with StaleDataError instead of silently overwriting.  Core
+statements that rewrite cards bump the counter themselves.
+
+Clients send the version they last saw as ``If-Match: "<version>"``.  A
+mismatch answers 409 with the current state, so the client can show what
+changed without anyone holding a lock between requests.  Requests without
+``If-Match`` keep the old last-write-wins behaviour.
+"""
+from flask import jsonify, make_response, request
+
+
+def version_etag(obj):
+    """Strong ETag value for a versioned row"""
+    return str(obj.version)
+
+
+def precondition_failed(obj):
+    """True if the request's If-Match doesn't name ``obj``'s current version"""
+    return bool(request.if_match) and not request.if_match.contains(version_etag(obj))
+
+
+def conflict_response(obj):
+    """409 carrying the row's current state and version"""
+    name = type(obj).__name__.lower()
+    response = jsonify({'success': False,
+                        'error': f'This {name} was changed by someone else; reload and try again.',
+                        name: obj.to_dict()})
+    response.status_code = 409
+    response.set_etag(version_etag(obj))
+    return response
+
+
+def with_version(response, obj):
+    """Attach the row's version to a response as its ETag"""
+    response = make_response(response)
+    response.set_etag(version_etag(obj))
+    return response
@@ -0,0 +1,37 @@
+"""Cross-board "my work" view.
+
+Cards carry their board owner's id, so a page of the user's cards, newest
+``(updated_at, id)`` first, is read straight off the
+``ix_cards_user_id_updated_at_id`` index with no sort: each card's lane and
+board are joined by primary key to filter out template boards and apply the
+lane and category filters.
+"""
+from sqlalchemy.orm import contains_eager, defer, selectinload
+from app.models import Board, Lane, Card, Category
+
+# Keyset sort key for the dashboard, newest first
+SORT_COLUMNS = (Card.updated_at, Card.id)
+
+
+def _like_pattern(pattern):
+    """Turn a lane title glob ("Doing*", "*review*") into an escaped LIKE pattern"""
+    escaped = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped.replace('*', '%')
+
+
+def dashboard_query(user_id, lane_pattern=None, category_id=None):
+    """Query for the user's cards across all boards, lane and board preloaded"""
+    query = (Card.query
+             .join(Card.lane)
+             .join(Lane.board)
+             .filter(Card.user_id == user_id, Board.is_template == False)
+             .options(contains_eager(Card.lane).contains_eager(Lane.board),
+                      defer(Card.description),
+                      selectinload(Card.categories)))
+
+    if lane_pattern:
+        # Case-insensitive, like the lane titles users type
+        query = query.filter(Lane.title.ilike(_like_pattern(lane_pattern), escape='\\'))
+    if category_id:
+        query = query.filter(Card.categories.any(Category.id == category_id))
+    return query
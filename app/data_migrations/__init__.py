@@ -0,0 +1,143 @@
+"""Chunked, resumable online data migrations.
+
+Alembic revisions change the schema; backfills and rewrites of existing rows
+live here instead so they can run against a live database.  A migration
+walks its table in keyset order (``WHERE key > :last ORDER BY key LIMIT n``)
+and each chunk is committed together with its checkpoint in
+``data_migrations``, so an interrupted run resumes exactly after the last
+committed chunk.
+
+Between chunks the runner sleeps long enough to keep its share of the
+database at ``DATA_MIGRATION_DUTY_CYCLE`` (0.5 = busy at most half the time),
+and when the SQLite write lock is contended it rolls back and backs off
+instead of failing.  Drive it with ``flask --app run data-migrate``.
+
+To add a migration, create a module in this package with a
+:class:`DataMigration` subclass decorated with :func:`register`.
+"""
+from datetime import datetime
+import importlib
+import pkgutil
+import time
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import DataMigrationState
+
+# Registered migrations by name
+migrations = {}
+
+
+def register(cls):
+    """Class decorator adding a migration to the registry"""
+    migrations[cls.name] = cls
+    return cls
+
+
+def load_migrations():
+    """Import every module in this package so their migrations register"""
+    for module in pkgutil.iter_modules(__path__):
+        importlib.import_module(f'{__name__}.{module.name}')
+    return migrations
+
+
+class DataMigration:
+    """A data migration processed in keyset-ordered chunks.
+
+    Subclasses set ``name``, ``description`` and ``key`` (an integer Core column,
+    usually a primary key) and implement :meth:`migrate_chunk`.
+    """
+    name = None
+    description = ''
+    key = None
+    chunk_size = None  # Defaults to DATA_MIGRATION_CHUNK_SIZE
+
+    def chunk_query(self, after, limit):
+        """Select the keys of the next chunk; override to add filters"""
+        return select(self.key).where(self.key > after).order_by(self.key).limit(limit)
+
+    def migrate_chunk(self, keys):
+        """Rewrite the rows for ``keys`` (the runner commits); returns rows changed"""
+        raise NotImplementedError
+
+
+def get_state(name):
+    return db.session.get(DataMigrationState, name)
+
+
+def reset_state(name):
+    """Forget a migration's checkpoint so the next run starts from the beginning"""
+    state = get_state(name)
+    if state:
+        db.session.delete(state)
+        db.session.commit()
+
+
+def _is_locked(error):
+    return 'database is locked' in str(error.orig)
+
+
+def run_migration(migration, chunk_size=None, duty_cycle=None, max_chunks=None, log=print):
+    """Run (or resume) a migration until it finishes or ``max_chunks`` is reached.
+
+    Returns the checkpoint state.  Raises ValueError, before touching any
+    rows, unless ``0 < duty_cycle <= 1``.
+    """
+    config = current_app.config
+    chunk_size = chunk_size or migration.chunk_size or config['DATA_MIGRATION_CHUNK_SIZE']
+    duty_cycle = config['DATA_MIGRATION_DUTY_CYCLE'] if duty_cycle is None else duty_cycle
+    if not 0 < duty_cycle <= 1:
+        raise ValueError(f'Duty cycle must be above 0 and at most 1, not {duty_cycle}')
+    max_retries = config['DATA_MIGRATION_MAX_RETRIES']
+
+    state = get_state(migration.name)
+    if state is None:
+        state = DataMigrationState(name=migration.name)
+        db.session.add(state)
+        db.session.commit()
+    elif state.finished_at:
+        log(f"{migration.name} already finished at {state.finished_at}")
+        return state
+    else:
+        log(f"Resuming {migration.name} after key {state.last_key}")
+
+    chunks = 0
+    retries = 0
+    while max_chunks is None or chunks < max_chunks:
+        started = time.monotonic()
+        try:
+            keys = db.session.execute(migration.chunk_query(state.last_key, chunk_size)).scalars().all()
+            if not keys:
+                state.finished_at = datetime.utcnow()
+                state.updated_at = state.finished_at
+                db.session.commit()
+                log(f"{migration.name} finished: {state.rows_done} rows in {state.chunks_done} chunks")
+                break
+
+            rows = migration.migrate_chunk(keys)
+            # The checkpoint commits atomically with the chunk it describes
+            state.last_key = keys[-1]
+            state.rows_done += rows if rows is not None else len(keys)
+            state.chunks_done += 1
+            state.updated_at = datetime.utcnow()
+            db.session.commit()
+        except OperationalError as e:
+            db.session.rollback()
+            if not _is_locked(e) or retries >= max_retries:
+                raise
+            retries += 1
+            delay = min(2 ** retries * 0.1, 10)
+            log(f"Database busy, retrying chunk after key {state.last_key} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        retries = 0
+        chunks += 1
+        elapsed = time.monotonic() - started
+        log(f"{migration.name}: chunk {state.chunks_done} up to key {state.last_key} "
+            f"({state.rows_done} rows) in {elapsed * 1000:.0f} ms")
+        # Leave the database idle long enough for live traffic to get through
+        time.sleep(elapsed * (1 - duty_cycle) / duty_cycle)
+
+    return state
@@ -0,0 +1,39 @@
+"""Renumber card positions to 1..n within each lane.
+
+Drag-and-drop leaves fractional and gapped positions behind; this rewrites
+them as consecutive integers, keeping the current order.  Chunks are lanes,
+and each chunk is one ``UPDATE ... FROM`` over a window-function ranking.
+"""
+from sqlalchemy import func, select, update
+from app import db
+from app.models import Board, Lane, Card
+from app.data_migrations import DataMigration, register
+
+
+@register
+class RenumberCardPositions(DataMigration):
+    name = 'renumber-card-positions'
+    description = 'Renumber card positions to 1..n within each lane'
+    key = Lane.__table__.c.id
+    chunk_size = 200  # Lanes per chunk
+
+    def migrate_chunk(self, lane_ids):
+        cards = Card.__table__
+        ranked = (select(cards.c.id,
+                         func.row_number().over(partition_by=cards.c.lane_id,
+                                                order_by=(cards.c.position, cards.c.id)).label('rank'))
+                  .where(cards.c.lane_id.in_(lane_ids))
+                  .subquery())
+
+        result = db.session.execute(
+            update(cards)
+            .where(cards.c.id == ranked.c.id, cards.c.position != ranked.c.rank)
+            .values(position=ranked.c.rank, version=cards.c.version + 1)
+        )
+
+        if result.rowcount:
+            board_ids = db.session.execute(
+                select(Lane.board_id).distinct().where(Lane.id.in_(lane_ids))
+            ).scalars().all()
+            Board.bump_revision(*board_ids)
+        return result.rowcount
@@ -1,9 +1,23 @@
 from flask import render_template, current_app
-from flask_mail import Message
-from app import mail
+from app.metrics import smtp_timer
 from itsdangerous import URLSafeTimedSerializer
 import secrets
 
+# Seconds a verification link stays valid
+TOKEN_EXPIRATION = 3600
+
+_mail = None
+
+def get_mail():
+    """The Flask-Mail extension, imported and set up when the first email is sent"""
+    global _mail
+    if _mail is None:
+        from flask_mail import Mail
+        _mail = Mail()
+    if 'mail' not in current_app.extensions:
+        _mail.init_app(current_app)
+    return _mail
+
 def generate_verification_token():
     """Generate a unique verification token"""
     return secrets.token_urlsafe(32)
@@ -17,7 +31,7 @@ def generate_confirmation_token(email):
     serializer = get_serializer()
     return serializer.dumps(email, salt='email-confirm')
 
-def confirm_token(token, expiration=3600):
+def confirm_token(token, expiration=TOKEN_EXPIRATION):
     """Verify a confirmation token (default expiration: 1 hour)"""
     serializer = get_serializer()
     try:
@@ -32,6 +46,8 @@ def confirm_token(token, expiration=3600):
 
 def send_verification_email(user, verification_url):
     """Send verification email to user"""
+    from flask_mail import Message
+    mail = get_mail()  # Before building the Message, which reads the default sender from it
     msg = Message(
         'Verify Your Email - Kanban Board',
         recipients=[user.email]
@@ -52,8 +68,44 @@ Kanban Board Team
     msg.html = render_template('emails/verify_email.html', user=user, verification_url=verification_url)
 
     try:
-        mail.send(msg)
+        with smtp_timer():
+            mail.send(msg)
         return True
     except Exception as e:
         current_app.logger.error(f"Failed to send email: {str(e)}")
         return False
+
+def send_due_reminders(reminders):
+    """Send due-date reminder emails over a single SMTP connection.
+
+    ``reminders`` is a list of ``(user, cards)`` pairs.  Returns the ids of
+    the users whose email was sent.
+    """
+    from flask_mail import Message
+    mail = get_mail()
+    sent = []
+    try:
+        with mail.connect() as connection:
+            for user, cards in reminders:
+                msg = Message(
+                    f'{len(cards)} card(s) due soon - Kanban Board',
+                    recipients=[user.email]
+                )
+                lines = '\n'.join(f"- {card['title']} ({card['board']} / {card['lane']}), "
+                                  f"due {card['due_date']:%Y-%m-%d %H:%M} UTC" for card in cards)
+                msg.body = f'''Hello {user.username},
+
+The following cards are due soon or overdue:
+
+{lines}
+
+Best regards,
+Kanban Board Team
+'''
+                msg.html = render_template('emails/due_reminder.html', user=user, cards=cards)
+                with smtp_timer():
+                    connection.send(msg)
+                sent.append(user.id)
+    except Exception as e:
+        current_app.logger.error(f"Failed to send reminder email: {str(e)}")
+    return sent
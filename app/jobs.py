@@ -0,0 +1,89 @@
+"""In-process scheduler for background jobs.
+
+Jobs are kept in a min-heap ordered by deadline.  The runner sleeps on a
+condition variable until the earliest deadline (or until a new, earlier job
+is scheduled) instead of polling, and runs each job inside an application
+context.  Start it in a dedicated process with ``flask --app run run-jobs``
+so that multi-worker web servers don't run every job once per worker.
+"""
+import functools
+import heapq
+import itertools
+import threading
+import time
+
+
+class Scheduler:
+    """Deadline-ordered job runner"""
+
+    def __init__(self, app):
+        self.app = app
+        self._heap = []
+        self._counter = itertools.count()  # Tie-breaker so equal deadlines never compare callables
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def schedule(self, when, func, *args):
+        """Run ``func(*args)`` at the given UNIX timestamp; returns a handle for cancel()"""
+        entry = [when, next(self._counter), func, args]
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            # Wake the runner in case this deadline is earlier than the one it sleeps on
+            self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        """Cancel a scheduled job (lazily removed when it reaches the top of the heap)"""
+        with self._condition:
+            entry[2] = None
+
+    def every(self, interval, func, *args, run_now=False):
+        """Run ``func(*args)`` repeatedly, ``interval`` seconds apart"""
+        @functools.wraps(func)
+        def repeat():
+            try:
+                func(*args)
+            finally:
+                self.schedule(time.time() + interval, repeat)
+
+        return self.schedule(time.time() + (0 if run_now else interval), repeat)
+
+    def stop(self):
+        """Ask the runner loop to exit after the current job"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _next_job(self):
+        """Block until a job is due and pop it, or return None once stopped"""
+        with self._condition:
+            while not self._stopped:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                _, _, func, args = heapq.heappop(self._heap)
+                return func, args
+        return None
+
+    def run(self):
+        """Run jobs until stop() is called"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            func, args = job
+            with self.app.app_context():
+                try:
+                    func(*args)
+                except Exception:
+                    self.app.logger.exception(f"Scheduled job {getattr(func, '__name__', func)} failed")
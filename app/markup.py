@@ -0,0 +1,33 @@
+"""Markdown rendering for card descriptions.
+
+Descriptions are rendered server-side, sanitised with bleach, and cached
+per worker keyed by a digest of the text itself, so re-opening an unchanged
+card never re-renders it.  (Card ids can't be part of the key: SQLite hands
+a deleted card's id to the next card created.)
+"""
+import hashlib
+import bleach
+import markdown
+from markupsafe import Markup
+from app.cache import LRUCache
+
+ALLOWED_TAGS = sorted(bleach.sanitizer.ALLOWED_TAGS | {
+    'p', 'pre', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td', 'del'
+})
+ALLOWED_ATTRIBUTES = {'a': ['href', 'title'], 'abbr': ['title'], 'acronym': ['title']}
+
+markdown_cache = LRUCache('card_markdown', maxsize=2048)
+
+
+def render_markdown(text):
+    """Render markdown to sanitised HTML"""
+    html = markdown.markdown(text or '', extensions=['fenced_code', 'tables', 'sane_lists'])
+    html = bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    return Markup(bleach.linkify(html))
+
+
+def card_description_html(card):
+    """Rendered description for a card, cached against its text"""
+    key = hashlib.sha256((card.description or '').encode()).hexdigest()
+    return markdown_cache.get_or_set(key, lambda: render_markdown(card.description))
@@ -0,0 +1,333 @@
+"""Prometheus metrics.
+
+Every request is counted per endpoint (``main.board``, ``auth.login``; never
+the raw URL, so label cardinality stays bounded) and its latency recorded in
+a fixed-bucket histogram.  Counts live in plain dicts behind one lock that
+is held only for a couple of increments, so recording costs a bisect and a
+few additions.  SMTP sends are timed the same way, and the database pool and
+the ``app.cache`` LRU caches are read when metrics are collected.
+
+``GET /metrics`` returns the Prometheus text format.  It is only served to
+loopback clients unless ``METRICS_TOKEN`` is set, in which case it requires
+``Authorization: Bearer <token>``.
+
+With several worker processes each worker only sees its own requests.  Set
+``METRICS_DIR`` to a directory shared by the workers: each one writes a
+snapshot of its metrics there (``<pid>-<start time>.json``, as pids get
+reused) every ``METRICS_FLUSH_INTERVAL`` seconds from a background thread,
+and once more when a gunicorn worker exits (the ``worker_exit`` hook in
+gunicorn.conf.py), and a scrape sums counters and histograms over all
+snapshots.  Counters of workers that have exited are
+kept so totals never go backwards; gauges only count snapshots younger than
+three flush intervals.  Empty the directory when the server starts.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import hmac
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from flask import Blueprint, Response, abort, current_app, g, request
+from app import db
+from app.cache import caches
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SMTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    'kanban_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+    'kanban_http_request_errors_total': ('counter', 'HTTP requests answered with a 5xx status'),
+    'kanban_http_request_duration_seconds': ('histogram', 'Time to produce a response, by endpoint'),
+    'kanban_smtp_send_duration_seconds': ('histogram', 'Time to hand one email to the SMTP server'),
+    'kanban_smtp_send_failures_total': ('counter', 'Emails the SMTP server did not accept'),
+    'kanban_cache_hits_total': ('counter', 'In-process cache hits'),
+    'kanban_cache_misses_total': ('counter', 'In-process cache misses'),
+    'kanban_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits'),
+    'kanban_cache_entries': ('gauge', 'Entries held by in-process caches'),
+    'kanban_db_pool_size': ('gauge', 'Configured database connection pool size'),
+    'kanban_db_pool_connections': ('gauge', 'Database connections by state'),
+    'kanban_worker_processes': ('gauge', 'Worker processes with a recent metrics snapshot'),
+}
+
+bp = Blueprint('metrics', __name__)
+
+
+class Registry:
+    """Counters and histograms of one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts (last is +Inf), sum]
+        self.buckets = {}  # histogram name -> upper bounds
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, buckets, value, labels=()):
+        index = bisect_left(buckets, value)
+        key = (name, labels)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+                self.buckets[name] = buckets
+            entry[0][index] += 1
+            entry[1] += value
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """JSON-serialisable copy of the current values"""
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, self.buckets[name], counts[:], total]
+                               for (name, labels), (counts, total) in self.histograms.items()],
+            }
+
+
+registry = Registry()
+_started_ns = time.time_ns()
+
+
+def _after_fork():
+    global _started_ns
+    registry.reset()
+    _started_ns = time.time_ns()
+
+
+if hasattr(os, 'register_at_fork'):
+    # Workers forked from a preloaded master must not inherit its counts or identity
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def snapshot_name():
+    """This process's snapshot file name; unique even when a pid is reused"""
+    return f'{os.getpid()}-{_started_ns}.json'
+
+
+def _collect_resources():
+    """Counters and gauges read from the cache registry and the connection pool"""
+    counters, gauges = [], []
+    for name, cache in caches.items():
+        labels = (('cache', name),)
+        counters.append(['kanban_cache_hits_total', labels, cache.hits])
+        counters.append(['kanban_cache_misses_total', labels, cache.misses])
+        gauges.append(['kanban_cache_entries', labels, len(cache)])
+
+    pool = db.engine.pool
+    if hasattr(pool, 'checkedout'):  # QueuePool; NullPool and StaticPool keep no counts
+        gauges.append(['kanban_db_pool_size', (), pool.size()])
+        gauges.append(['kanban_db_pool_connections', (('state', 'checked_out'),), pool.checkedout()])
+        gauges.append(['kanban_db_pool_connections', (('state', 'idle'),), pool.checkedin()])
+        gauges.append(['kanban_db_pool_connections', (('state', 'overflow'),), max(pool.overflow(), 0)])
+    return counters, gauges
+
+
+def process_snapshot():
+    """Everything this process reports, as written to ``METRICS_DIR``"""
+    snapshot = registry.snapshot()
+    counters, gauges = _collect_resources()
+    snapshot['counters'].extend(counters)
+    snapshot['gauges'] = gauges
+    snapshot['pid'] = os.getpid()
+    snapshot['time'] = time.time()
+    return snapshot
+
+
+def write_snapshot(metrics_dir):
+    """Atomically replace this process's snapshot file"""
+    metrics_dir = Path(metrics_dir)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    fd, partial = tempfile.mkstemp(suffix='.part', dir=metrics_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(process_snapshot(), f)
+    os.replace(partial, metrics_dir / snapshot_name())
+
+
+def flush(app):
+    """Write this process's snapshot now, if METRICS_DIR is set (gunicorn's worker_exit hook calls this)"""
+    metrics_dir = app.config.get('METRICS_DIR')
+    if not metrics_dir or 'metrics' not in app.extensions:
+        return
+    with app.app_context():
+        try:
+            write_snapshot(metrics_dir)
+        except OSError as e:
+            app.logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+def _flush_periodically(app):
+    while True:
+        time.sleep(app.config['METRICS_FLUSH_INTERVAL'])
+        flush(app)
+
+
+def _ensure_flusher(app):
+    """Start this process's snapshot thread; threads don't survive a fork, so once per pid"""
+    state = app.extensions['metrics']
+    pid = os.getpid()
+    if state['flusher_pid'] == pid:
+        return
+    with state['lock']:
+        if state['flusher_pid'] != pid:
+            threading.Thread(target=_flush_periodically, args=(app,), name='metrics-flush', daemon=True).start()
+            state['flusher_pid'] = pid
+
+
+def _read_snapshots(metrics_dir):
+    """This process's live snapshot plus the files of every other worker"""
+    own = snapshot_name()
+    snapshots = [process_snapshot()]
+    for path in Path(metrics_dir).glob('*.json'):
+        if path.name == own:
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # Removed or half-written while we looked
+    return snapshots
+
+
+def aggregate(snapshots, stale_after):
+    """Sum per-process snapshots into (counters, histograms, gauges) dicts"""
+    counters, histograms, gauges = {}, {}, {}
+    now = time.time()
+    live = 0
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            entry = histograms.setdefault(key, [tuple(buckets), [0] * len(counts), 0.0])
+            entry[1] = [a + b for a, b in zip(entry[1], counts)]
+            entry[2] += total
+        if now - snapshot['time'] > stale_after:
+            continue  # An exited or long-idle worker; its gauges no longer describe anything
+        live += 1
+        for name, labels, value in snapshot['gauges']:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+
+    gauges[('kanban_worker_processes', ())] = live
+    for (name, labels), hits in list(counters.items()):
+        if name == 'kanban_cache_hits_total':
+            lookups = hits + counters.get(('kanban_cache_misses_total', labels), 0)
+            gauges[('kanban_cache_hit_ratio', labels)] = hits / lookups if lookups else 0
+    return counters, histograms, gauges
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(counters, histograms, gauges):
+    """Prometheus text exposition format"""
+    series = {}
+    for (name, labels), value in counters.items():
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), value in gauges.items():
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), (buckets, counts, total) in histograms.items():
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+    out = []
+    for name in sorted(series):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        out.extend(sorted(series[name]) if kind != 'histogram' else series[name])
+    return '\n'.join(out) + '\n'
+
+
+@contextmanager
+def smtp_timer():
+    """Time one SMTP send, counting it as failed if the block raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.inc('kanban_smtp_send_failures_total')
+        raise
+    finally:
+        registry.observe('kanban_smtp_send_duration_seconds', SMTP_BUCKETS, time.perf_counter() - started)
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('_metrics_started', None)
+    endpoint = request.endpoint or 'unmatched'
+    if started is None or endpoint == 'metrics.export':
+        return response
+
+    registry.observe('kanban_http_request_duration_seconds', LATENCY_BUCKETS, time.perf_counter() - started,
+                     (('endpoint', endpoint), ('method', request.method)))
+    registry.inc('kanban_http_requests_total',
+                 (('endpoint', endpoint), ('method', request.method), ('status', str(response.status_code))))
+    if response.status_code >= 500:
+        registry.inc('kanban_http_request_errors_total', (('endpoint', endpoint),))
+
+    if current_app.config['METRICS_DIR']:
+        _ensure_flusher(current_app._get_current_object())
+    return response
+
+
+@bp.route('/metrics')
+def export():
+    """Prometheus scrape endpoint"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(403)
+    elif not (current_app.debug or current_app.testing) or request.remote_addr not in ('127.0.0.1', '::1'):
+        # Behind the reverse proxy every request arrives from loopback, so
+        # outside development and tests the endpoint needs a token
+        abort(403)
+
+    metrics_dir = current_app.config['METRICS_DIR']
+    snapshots = _read_snapshots(metrics_dir) if metrics_dir else [process_snapshot()]
+    body = render(*aggregate(snapshots, 3 * current_app.config['METRICS_FLUSH_INTERVAL']))
+    response = Response(body, mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def init_app(app):
+    """Time every request and register the scrape endpoint"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.extensions['metrics'] = {'flusher_pid': None, 'lock': threading.Lock()}
+    # First, so a request short-circuited by a later before_request hook is still timed
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timer)
+    app.after_request(_record_request)
+    app.register_blueprint(bp)
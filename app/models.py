@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from flask import current_app
 from app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, needs_rehash, verify_password
 
 # Association table for many-to-many relationship between cards and categories
 card_categories = db.Table('card_categories',
@@ -19,18 +20,33 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     is_verified = db.Column(db.Boolean, default=False)
     verification_token = db.Column(db.String(100), unique=True)
+    verification_sent_at = db.Column(db.DateTime, default=datetime.utcnow)  # When the current token was issued
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # The cleanup job scans unverified accounts by token age
+    __table_args__ = (
+        db.Index('ix_users_is_verified_verification_sent_at', 'is_verified', 'verification_sent_at'),
+    )
+
     # Relationship with boards
     boards = db.relationship('Board', backref='owner', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """Check if password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True if the password was hashed with outdated KDF parameters"""
+        return needs_rehash(self.password_hash)
+
+    @property
+    def is_admin(self):
+        """Admins are configured by username in ADMIN_USERNAMES"""
+        return self.username in current_app.config['ADMIN_USERNAMES']
 
     def to_dict(self):
         """Convert user to dictionary"""
@@ -51,9 +67,20 @@ class Board(db.Model):
     description = db.Column(db.Text, default='')
     color = db.Column(db.String(7), default='#3B82F6')  # Hex color code for theme
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    is_template = db.Column(db.Boolean, nullable=False, default=False)  # Templates are hidden from the board list
+    revision = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every lane/card change
+    version = db.Column(db.Integer, nullable=False, default=1)  # Bumped on every edit of this row
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Set when switched to
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Keyset pagination indexes for the board list, by name and by recent use
+    __table_args__ = (
+        db.Index('ix_boards_user_template_name_id', 'user_id', 'is_template', 'name', 'id'),
+        db.Index('ix_boards_user_template_last_used_id', 'user_id', 'is_template', 'last_used_at', 'id'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
     # Relationship - cascade delete lanes when board is deleted
     lanes = db.relationship('Lane', backref='board', lazy=True,
                           cascade='all, delete-orphan', order_by='Lane.position')
@@ -65,10 +92,18 @@ class Board(db.Model):
             'name': self.name,
             'description': self.description,
             'color': self.color,
+            'is_template': self.is_template,
+            'version': self.version,
             'created_at': self.created_at.isoformat(),
             'lane_count': len(self.lanes)
         }
 
+    @staticmethod
+    def bump_revision(*board_ids):
+        """Mark boards' contents as changed (invalidates revision-keyed caches)"""
+        query = Board.query if not board_ids else Board.query.filter(Board.id.in_(board_ids))
+        query.update({Board.revision: Board.revision + 1}, synchronize_session=False)
+
 class Lane(db.Model):
     """Lane (column) on the Kanban board"""
     __tablename__ = 'lanes'
@@ -76,10 +111,17 @@ class Lane(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     position = db.Column(db.Float, nullable=False)
+    wip_limit = db.Column(db.Integer)  # Maximum number of cards, no limit when empty
     board_id = db.Column(db.Integer, db.ForeignKey('boards.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic concurrency counter
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_lanes_board_id_position', 'board_id', 'position'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
     # Relationship - cascade delete cards when lane is deleted
     cards = db.relationship('Card', backref='lane', lazy=True,
                           cascade='all, delete-orphan', order_by='Card.position')
@@ -90,10 +132,23 @@ class Lane(db.Model):
             'id': self.id,
             'title': self.title,
             'position': self.position,
+            'wip_limit': self.wip_limit,
+            'version': self.version,
             'created_at': self.created_at.isoformat(),
-            'card_count': len(self.cards)
+            # Counted in SQL: len(self.cards) would load every card, descriptions and all
+            'card_count': db.session.scalar(db.select(db.func.count(Card.id)).where(Card.lane_id == self.id))
         }
 
+def _lane_owner(context):
+    """Default for Card.user_id: the owner of the board the card's lane is on"""
+    lanes = Lane.__table__
+    boards = Board.__table__
+    return context.connection.execute(
+        db.select(boards.c.user_id)
+        .join(lanes, lanes.c.board_id == boards.c.id)
+        .where(lanes.c.id == context.get_current_parameters()['lane_id'])
+    ).scalar()
+
 class Card(db.Model):
     """Card within a lane"""
     __tablename__ = 'cards'
@@ -102,13 +157,34 @@ class Card(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, default='')
     lane_id = db.Column(db.Integer, db.ForeignKey('lanes.id'), nullable=False)
+    # The board owner, copied here so the dashboard pages through an index; boards never change owner
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, default=_lane_owner)
     position = db.Column(db.Float, nullable=False)
+    due_date = db.Column(db.DateTime)  # UTC
+    reminder_sent_at = db.Column(db.DateTime)  # Cleared whenever the due date changes
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic concurrency counter
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Archival scans cards per lane by age; due-date queries scan per lane by
+    # due date, the reminder job scans unsent reminders by due date, and the
+    # dashboard pages through a user's cards newest first.  AUTOINCREMENT
+    # stops SQLite handing a deleted or archived card's id to a new card,
+    # which would inherit its transition history
+    __table_args__ = (
+        db.Index('ix_cards_lane_id_updated_at', 'lane_id', 'updated_at'),
+        db.Index('ix_cards_user_id_updated_at_id', 'user_id', 'updated_at', 'id'),
+        db.Index('ix_cards_lane_id_due_date', 'lane_id', 'due_date'),
+        db.Index('ix_cards_reminder_sent_at_due_date', 'reminder_sent_at', 'due_date'),
+        {'sqlite_autoincrement': True},
+    )
+    __mapper_args__ = {'version_id_col': version}
+
     # Many-to-many relationship with categories
     categories = db.relationship('Category', secondary=card_categories,
                                 backref=db.backref('cards', lazy='dynamic'))
+    attachments = db.relationship('Attachment', backref='card', lazy=True,
+                                  cascade='all, delete-orphan', order_by='Attachment.id')
 
     def to_dict(self):
         """Convert card to dictionary"""
@@ -118,11 +194,50 @@ class Card(db.Model):
             'description': self.description,
             'lane_id': self.lane_id,
             'position': self.position,
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'version': self.version,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'categories': [cat.to_dict() for cat in self.categories]
         }
 
+    @property
+    def due_status(self):
+        """'overdue', 'soon' (within DUE_SOON_HOURS) or None, for color coding"""
+        if not self.due_date:
+            return None
+        now = datetime.utcnow()
+        if self.due_date < now:
+            return 'overdue'
+        if self.due_date < now + timedelta(hours=current_app.config['DUE_SOON_HOURS']):
+            return 'soon'
+        return None
+
+class Attachment(db.Model):
+    """File attached to a card; the content is a blob named by its SHA-256"""
+    __tablename__ = 'attachments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    card_id = db.Column(db.Integer, db.ForeignKey('cards.id'), index=True)  # Empty while archived
+    archived_card_id = db.Column(db.Integer, db.ForeignKey('archived_cards.id'), index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # Bytes
+    sha256 = db.Column(db.String(64), nullable=False, index=True)  # Blob name; shared by identical files
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert attachment to dictionary"""
+        return {
+            'id': self.id,
+            'card_id': self.card_id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at.isoformat()
+        }
+
 class Category(db.Model):
     """Category/label for cards"""
     __tablename__ = 'categories'
@@ -139,3 +254,98 @@ class Category(db.Model):
             'name': self.name,
             'color': self.color
         }
+
+class ArchivedCard(db.Model):
+    """Card moved out of the hot cards table into cold storage"""
+    __tablename__ = 'archived_cards'
+
+    id = db.Column(db.Integer, primary_key=True)
+    card_id = db.Column(db.Integer, nullable=False)  # Id the card had before archival
+    board_id = db.Column(db.Integer, db.ForeignKey('boards.id'), nullable=False)
+    lane_id = db.Column(db.Integer, nullable=False)  # Lane may since have been deleted
+    lane_title = db.Column(db.String(100), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, default='')
+    position = db.Column(db.Float, nullable=False)
+    due_date = db.Column(db.DateTime)
+    category_ids = db.Column(db.String(255))  # Comma-separated category ids
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Archive browsing pages through a board's cards newest first
+    __table_args__ = (
+        db.Index('ix_archived_cards_board_id_id', 'board_id', 'id'),
+    )
+
+    def to_dict(self):
+        """Convert archived card to dictionary"""
+        return {
+            'id': self.id,
+            'card_id': self.card_id,
+            'board_id': self.board_id,
+            'lane_id': self.lane_id,
+            'lane_title': self.lane_title,
+            'title': self.title,
+            'description': self.description,
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'category_ids': [int(cat_id) for cat_id in self.category_ids.split(',')] if self.category_ids else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived_at': self.archived_at.isoformat()
+        }
+
+class CardTransition(db.Model):
+    """Append-only log of a card entering or leaving a lane.
+
+    ``from_lane_id`` is empty when a card is created or restored and
+    ``to_lane_id`` is empty when it is deleted or archived.  Card and lane
+    ids are plain integers so the history outlives the rows it describes.
+    """
+    __tablename__ = 'card_transitions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    board_id = db.Column(db.Integer, db.ForeignKey('boards.id'), nullable=False)
+    card_id = db.Column(db.Integer, nullable=False)
+    from_lane_id = db.Column(db.Integer)
+    to_lane_id = db.Column(db.Integer)
+    age_seconds = db.Column(db.Integer, nullable=False, default=0)  # Card age when the transition happened
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Cycle-time queries read arrivals into one lane over a time range
+    __table_args__ = (
+        db.Index('ix_card_transitions_board_to_lane_created', 'board_id', 'to_lane_id', 'created_at'),
+    )
+
+class LaneDailyFlow(db.Model):
+    """Per-lane daily arrival/departure counts, maintained incrementally from transitions"""
+    __tablename__ = 'lane_daily_flow'
+
+    board_id = db.Column(db.Integer, db.ForeignKey('boards.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    lane_id = db.Column(db.Integer, primary_key=True)
+    arrivals = db.Column(db.Integer, nullable=False, default=0)
+    departures = db.Column(db.Integer, nullable=False, default=0)
+
+class DataMigrationState(db.Model):
+    """Checkpoint of a chunked data migration (see app/data_migrations)"""
+    __tablename__ = 'data_migrations'
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_key = db.Column(db.Integer, nullable=False, default=0)  # Highest key processed so far
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert checkpoint to dictionary"""
+        return {
+            'name': self.name,
+            'last_key': self.last_key,
+            'rows_done': self.rows_done,
+            'chunks_done': self.chunks_done,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
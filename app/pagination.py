@@ -0,0 +1,53 @@
+"""Keyset (cursor) pagination helpers.
+
+Pages are fetched with ``WHERE (sort columns) > (last row's values)`` on a
+unique sort key backed by an index, so every page costs the same no matter
+how deep the client scrolls.  The position is handed to the client as an
+opaque URL-safe cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, tuple_
+
+
+def encode_cursor(values):
+    """Encode sort-key values as an opaque cursor string"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor for the given sort columns; raises ValueError if malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    return [datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None
+            else value for column, value in zip(columns, values)]
+
+
+def keyset_page(query, columns, cursor=None, limit=50, descending=False):
+    """Fetch one page of ``query`` ordered by ``columns``.
+
+    ``columns`` must form a unique key (end with the primary key).  Returns
+    ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    order = [column.desc() if descending else column for column in columns]
+    # One extra row tells us whether another page exists without a COUNT
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
@@ -0,0 +1,111 @@
+"""Password hashing in a bounded process pool.
+
+Key derivation is deliberately CPU-heavy, and running it inline holds the
+GIL for the whole request, so a burst of logins stalls every other request
+on the worker.  Hashing and verification are instead sent to a small
+process pool (``PASSWORD_HASH_WORKERS``); the request thread just waits on
+the result with the GIL released.  At most ``PASSWORD_HASH_MAX_PENDING``
+jobs may be queued per process, beyond that callers get ``HashingBusy`` so
+a login storm turns into quick 503s instead of an unbounded backlog.
+
+Pool processes are started with "spawn", which re-imports the ``__main__``
+module; standalone scripts that hash passwords need an
+``if __name__ == '__main__':`` guard, or ``PASSWORD_HASH_WORKERS = 0`` to
+hash inline (also handy in tests).
+
+If a pool process dies (the OOM killer, a crash), the executor is broken for
+good; the first caller to notice replaces it and every caller caught by the
+breakage retries once on the new pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+
+
+def _new_pool(config):
+    # "spawn" children only import werkzeug.security; forking a threaded
+    # server process is unsafe
+    return ProcessPoolExecutor(max_workers=config['PASSWORD_HASH_WORKERS'],
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def _get_pool(config):
+    """The process's executor, created on first use (and again after a fork)"""
+    global _pool, _pool_pid, _slots
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = _new_pool(config)
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(config['PASSWORD_HASH_MAX_PENDING'])
+        return _pool, _slots
+
+
+def _replace_pool(broken, config):
+    """Swap a broken executor for a new one, unless another thread already has"""
+    global _pool
+    with _lock:
+        if _pool is broken:
+            current_app.logger.warning('Password hashing pool broken, starting a new one')
+            broken.shutdown(wait=False)
+            _pool = _new_pool(config)
+        return _pool
+
+
+def _run(func, *args):
+    config = current_app.config
+    if not config['PASSWORD_HASH_WORKERS']:
+        return func(*args)
+
+    pool, slots = _get_pool(config)
+    if not slots.acquire(timeout=config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+        raise HashingBusy()
+    try:
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            return _replace_pool(pool, config).submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def canonical_method(method):
+    """Spell out a Werkzeug hash method with all parameters ("scrypt" -> "scrypt:32768:8:1")"""
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ':'.join([name] + params + defaults[len(params):])
+
+
+def hash_password(password):
+    """Hash a password with the configured KDF"""
+    return _run(generate_password_hash, password, canonical_method(current_app.config['PASSWORD_HASH_METHOD']))
+
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with other KDF parameters than configured"""
+    stored_method = password_hash.split('$', 1)[0]
+    return stored_method != canonical_method(current_app.config['PASSWORD_HASH_METHOD'])
+
@@ -0,0 +1,224 @@
+"""On-demand profiling of single requests.
+
+An admin (a user listed in ``ADMIN_USERNAMES``) can profile any request by
+adding an ``X-Profile`` header or a ``_profile`` query parameter.  The value
+picks the profiler:
+
+* ``sample`` (or ``1``): a background thread records the request thread's
+  stack every ``PROFILE_SAMPLE_INTERVAL`` seconds.  The overhead is low
+  enough for production, and the result is written in collapsed-stack
+  format (``frame;frame;frame count``), which flamegraph.pl, speedscope
+  and similar viewers read directly.
+* ``cprofile``: deterministic cProfile.  It is slower, but it counts every
+  call, and it is written as a pstats dump.
+
+For anyone else the flag is ignored.  Each profile is stored in
+``PROFILE_DIR`` under the request's profile id, which is returned in the
+``X-Profile-Id`` response header.  Only the newest ``PROFILE_RETAIN`` are
+kept.  Admins can list and download profiles at ``/admin/profiles``.
+"""
+from collections import Counter
+import cProfile
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import re
+import secrets
+import sys
+import threading
+import time
+from flask import Blueprint, abort, current_app, g, render_template, request, send_file
+from flask_login import current_user, login_required
+
+MODES = {'1': 'sample', 'sample': 'sample', 'cprofile': 'cprofile'}
+SUFFIXES = {'sample': '.collapsed', 'cprofile': '.prof'}
+PROFILE_ID = re.compile(r'^\d{8}-\d{12}-[0-9a-f]{6}$')
+
+bp = Blueprint('profiling', __name__)
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, thread_id, interval, root):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.counts = Counter()
+        self._labels = {}  # code object -> frame label
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            path = _short_path(code.co_filename, self.root)
+            label = self._labels[code] = f'{code.co_name} ({path}:{code.co_firstlineno})'
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+        return sum(self.counts.values())
+
+
+def _short_path(filename, root):
+    """Source path relative to the project or to site-packages"""
+    if filename.startswith(root):
+        return filename[len(root):]
+    index = filename.rfind('site-packages' + os.sep)
+    if index != -1:
+        return filename[index + len('site-packages' + os.sep):]
+    return filename
+
+
+def _requested_mode():
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    if not flag:
+        return None
+    mode = MODES.get(flag.lower())
+    if mode is None or not current_user.is_authenticated or not current_user.is_admin:
+        return None
+    return mode
+
+
+def _start_profile():
+    mode = _requested_mode()
+    if mode is None:
+        return
+
+    if mode == 'sample':
+        profiler = StackSampler(threading.get_ident(), current_app.config['PROFILE_SAMPLE_INTERVAL'],
+                                str(Path(current_app.root_path).parent) + os.sep)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g._profile = (mode, profiler, time.perf_counter())
+
+
+def _stop_profile(response=None):
+    profile = g.pop('_profile', None)
+    if profile is None:
+        return response
+    mode, profiler, started = profile
+    if mode == 'sample':
+        profiler.stop()
+    else:
+        profiler.disable()
+    duration = time.perf_counter() - started
+
+    profile_dir = Path(current_app.config['PROFILE_DIR'])
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    # Sortable by capture time, so rotation and the viewer can go by name
+    profile_id = f"{datetime.utcnow():%Y%m%d-%H%M%S%f}-{secrets.token_hex(3)}"
+    path = profile_dir / f'{profile_id}{SUFFIXES[mode]}'
+    if mode == 'sample':
+        samples = profiler.write(path)
+    else:
+        profiler.dump_stats(path)
+        samples = None
+
+    meta = {
+        'id': profile_id,
+        'mode': mode,
+        'file': path.name,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': response.status_code if response is not None else 500,
+        'user': current_user.username,
+        'duration_ms': round(duration * 1000, 1),
+        'samples': samples,
+        'created_at': datetime.utcnow().isoformat(),
+    }
+    with open(profile_dir / f'{profile_id}.json', 'w') as f:
+        json.dump(meta, f)
+    _rotate(profile_dir, current_app.config['PROFILE_RETAIN'])
+    current_app.logger.info(f"Profiled {request.method} {request.path} as {profile_id} ({mode})")
+
+    if response is not None:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def _teardown_profile(exc):
+    # Safety net for requests that never reach after_request (e.g. a failing hook)
+    if '_profile' in g:
+        _stop_profile()
+
+
+def list_profiles(profile_dir):
+    """Profile metadata, newest first"""
+    profiles = []
+    for path in sorted(Path(profile_dir).glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def _rotate(profile_dir, retain):
+    for meta in sorted(Path(profile_dir).glob('*.json'), reverse=True)[retain:]:
+        for suffix in SUFFIXES.values():
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+        meta.unlink()
+
+
+def _require_admin():
+    if not current_user.is_admin:
+        abort(403)
+
+
+@bp.route('/admin/profiles')
+@login_required
+def profiles():
+    """List captured request profiles"""
+    _require_admin()
+    return render_template('admin_profiles.html',
+                           profiles=list_profiles(current_app.config['PROFILE_DIR']))
+
+
+@bp.route('/admin/profiles/<profile_id>')
+@login_required
+def download_profile(profile_id):
+    """Download one profile (collapsed stacks as text, cProfile as a pstats file)"""
+    _require_admin()
+    if not PROFILE_ID.match(profile_id):
+        abort(404)
+    profile_dir = Path(current_app.config['PROFILE_DIR'])
+    for mode, suffix in SUFFIXES.items():
+        path = profile_dir / f'{profile_id}{suffix}'
+        if path.exists():
+            if mode == 'sample':
+                return send_file(path, mimetype='text/plain', as_attachment=request.args.get('download') == '1')
+            return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+    abort(404)
+
+
+def init_app(app):
+    """Install the profiling hooks and the admin viewer"""
+    app.before_request(_start_profile)
+    app.after_request(_stop_profile)
+    app.teardown_request(_teardown_profile)
+    app.register_blueprint(bp)
@@ -0,0 +1,121 @@
+"""Read-only views of a board for rendering.
+
+The board page only reads its lanes, cards and categories, so it doesn't
+need ORM instances with their identity map entries, attribute
+instrumentation and change tracking.  These functions run plain Core
+selects and build small ``__slots__`` objects carrying just the attributes
+the templates use; the partials render them exactly like the ORM objects.
+
+A board is three queries whatever its size: the lanes, the cards (without
+descriptions), and the card/category pairs.  Categories are shared, so each
+appears once in memory however many cards carry it.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models import Lane, Card, Category, card_categories
+
+
+class CategoryView:
+    __slots__ = ('id', 'name', 'color')
+
+    def __init__(self, id, name, color):
+        self.id = id
+        self.name = name
+        self.color = color
+
+
+class CardView:
+    __slots__ = ('id', 'title', 'lane_id', 'position', 'due_date', 'due_status', 'version', 'categories')
+
+    def __init__(self, id, title, lane_id, position, due_date, due_status, version):
+        self.id = id
+        self.title = title
+        self.lane_id = lane_id
+        self.position = position
+        self.due_date = due_date
+        self.due_status = due_status
+        self.version = version
+        self.categories = []
+
+
+class LaneView:
+    __slots__ = ('id', 'title', 'position', 'wip_limit', 'version', 'cards')
+
+    def __init__(self, id, title, position, wip_limit, version):
+        self.id = id
+        self.title = title
+        self.position = position
+        self.wip_limit = wip_limit
+        self.version = version
+        self.cards = []
+
+
+def category_views():
+    """Every category, as views keyed by id"""
+    categories = Category.__table__
+    rows = db.session.execute(
+        select(categories.c.id, categories.c.name, categories.c.color).order_by(categories.c.id)
+    )
+    return {row.id: CategoryView(*row) for row in rows}
+
+
+def _due_status(due_date, now, soon):
+    """Same rule as Card.due_status, with the thresholds worked out once per board"""
+    if due_date is None:
+        return None
+    if due_date < now:
+        return 'overdue'
+    if due_date < soon:
+        return 'soon'
+    return None
+
+
+def board_lanes(board_id, categories=None):
+    """The board's lanes in order, each with its cards in order and their categories.
+
+    ``categories`` is the result of category_views(), if the caller already
+    has it.
+    """
+    lanes = Lane.__table__
+    cards = Card.__table__
+    if categories is None:
+        categories = category_views()
+
+    lane_views = [LaneView(*row) for row in db.session.execute(
+        select(lanes.c.id, lanes.c.title, lanes.c.position, lanes.c.wip_limit, lanes.c.version)
+        .where(lanes.c.board_id == board_id)
+        .order_by(lanes.c.position)
+    )]
+    by_lane = {lane.id: lane for lane in lane_views}
+
+    now = datetime.utcnow()
+    soon = now + timedelta(hours=current_app.config['DUE_SOON_HOURS'])
+    board_cards = (select(cards.c.id)
+                   .join(lanes, cards.c.lane_id == lanes.c.id)
+                   .where(lanes.c.board_id == board_id))
+    by_card = {}
+    for id, title, lane_id, position, due_date, version in db.session.execute(
+        select(cards.c.id, cards.c.title, cards.c.lane_id, cards.c.position, cards.c.due_date, cards.c.version)
+        .where(cards.c.id.in_(board_cards))
+        .order_by(cards.c.lane_id, cards.c.position)
+    ):
+        lane = by_lane.get(lane_id)
+        if lane is None:
+            continue  # Lane added since the lanes were read
+        card = CardView(id, title, lane_id, position, due_date, _due_status(due_date, now, soon), version)
+        lane.cards.append(card)
+        by_card[id] = card
+
+    for card_id, category_id in db.session.execute(
+        select(card_categories.c.card_id, card_categories.c.category_id)
+        .where(card_categories.c.card_id.in_(board_cards))
+        .order_by(card_categories.c.card_id, card_categories.c.category_id)
+    ):
+        card = by_card.get(card_id)
+        category = categories.get(category_id)
+        if card is not None and category is not None:  # Both may be newer than the earlier reads
+            card.categories.append(category)
+
+    return lane_views
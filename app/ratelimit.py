@@ -0,0 +1,176 @@
+"""Token-bucket rate limiting.
+
+Limits are configured per endpoint (``"auth.login"``) or per blueprint
+(``"auth"``) in ``RATE_LIMITS``, each with an optional per-IP and per-user
+bucket given as ``(capacity, period_seconds)``: a bucket holds up to
+``capacity`` tokens and refills at ``capacity / period`` tokens per second.
+Every state-changing request (safe methods are never limited) takes one
+token from each of its buckets; if any of them is empty it takes none and
+answers 429 with a ``Retry-After`` header, so rejected requests don't drain
+the other limits.  The endpoints that fall back to a blueprint entry
+all draw from that entry's buckets.
+
+Buckets are two floats (tokens, last refill time) updated lazily on use, so
+a check is O(1) and needs no background timer.  The default store is a
+bounded in-process LRU dict, i.e. per worker.  Set ``RATE_LIMIT_STORAGE`` to
+a SQLite file path to share buckets between workers; each check is then one
+short write transaction against that file, kept apart from the main
+database so limiting never contends with its write lock.
+
+The client address is ``request.remote_addr``; behind a reverse proxy wrap
+the app in Werkzeug's ``ProxyFix`` so that is the real client.
+"""
+from collections import OrderedDict
+import math
+import sqlite3
+import threading
+import time
+from flask import current_app, request
+from flask_login import current_user
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def _take_all(buckets, levels):
+    """Decide a request from its buckets' refilled token levels.
+
+    Either every bucket has a token and each gives one up, or none is
+    charged.  Returns (allowed, new levels, seconds until a retry can pass).
+    """
+    if all(tokens >= 1 for tokens in levels):
+        return True, [tokens - 1 for tokens in levels], 0
+    retry_after = max(math.ceil((1 - tokens) / rate)
+                      for (_, _, rate), tokens in zip(buckets, levels) if tokens < 1)
+    return False, levels, retry_after
+
+
+class MemoryBuckets:
+    """Per-process buckets in a bounded LRU dict"""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        """Take one token from each (key, capacity, rate) bucket, or from none.
+
+        Returns (allowed, seconds until a retry can pass).
+        """
+        with self._lock:
+            levels = []
+            for key, capacity, rate in buckets:
+                tokens, updated_at = self._buckets.pop(key, (capacity, now))
+                levels.append(min(capacity, tokens + (now - updated_at) * rate))
+            allowed, levels, retry_after = _take_all(buckets, levels)
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # Forgetting the least recently used bucket only makes it full again
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteBuckets:
+    """Buckets shared by all workers through a small SQLite file"""
+
+    SAVE = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at, allowed)
+        VALUES (:key, :tokens, :now, :allowed)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = excluded.tokens, updated_at = excluded.updated_at, allowed = excluded.allowed
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # Losing a few buckets in a crash is harmless
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    allowed INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._local.conn = conn
+        return conn
+
+    def take(self, buckets, now):
+        """Take one token from each (key, capacity, rate) bucket, or from none.
+
+        Returns (allowed, seconds until a retry can pass).
+        """
+        conn = self._connection()
+        # The write lock is taken up front so no other worker reads the same
+        # buckets between our read and our write
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            levels = []
+            for key, capacity, rate in buckets:
+                row = conn.execute('SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?',
+                                   (key,)).fetchone()
+                tokens, updated_at = row or (capacity, now)
+                levels.append(min(capacity, tokens + (now - updated_at) * rate))
+            allowed, levels, retry_after = _take_all(buckets, levels)
+            conn.executemany(self.SAVE, [{'key': key, 'tokens': tokens, 'now': now, 'allowed': allowed}
+                                         for (key, _, _), tokens in zip(buckets, levels)])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def _limits_for(endpoint):
+    """The RATE_LIMITS entry for an endpoint: (config key, limits), or (None, None).
+
+    Endpoints without their own entry fall back to their blueprint's and
+    then share its buckets, keyed by the blueprint name.
+    """
+    limits = current_app.config['RATE_LIMITS']
+    for key in (endpoint, endpoint.split('.', 1)[0]):
+        if key in limits:
+            return key, limits[key]
+    return None, None
+
+
+def check_rate_limit():
+    """before_request hook: take tokens for this request or answer 429"""
+    if request.method in SAFE_METHODS or not request.endpoint:
+        return None
+    limit_key, limits = _limits_for(request.endpoint)
+    if not limits:
+        return None
+
+    buckets = []
+    for scope, (capacity, period) in limits.items():
+        if scope == 'user':
+            if not current_user.is_authenticated:
+                continue
+            identity = current_user.get_id()
+        else:
+            identity = request.remote_addr
+        buckets.append((f'{limit_key}:{scope}:{identity}', capacity, capacity / period))
+    if not buckets:
+        return None
+
+    allowed, retry_after = current_app.extensions['rate_limit'].take(buckets, time.time())
+    if not allowed:
+        current_app.logger.info(f"Rate limited {request.endpoint} for {request.remote_addr}")
+        return 'Too many requests, please slow down.', 429, {'Retry-After': str(retry_after)}
+    return None
+
+
+def init_app(app):
+    """Create the bucket store and install the before_request check"""
+    path = app.config['RATE_LIMIT_STORAGE']
+    app.extensions['rate_limit'] = SQLiteBuckets(path) if path else \
+        MemoryBuckets(app.config['RATE_LIMIT_MAX_KEYS'])
+    app.before_request(check_rate_limit)
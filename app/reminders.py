@@ -0,0 +1,102 @@
+"""Due-date queries and the reminder job.
+
+Overdue and due-soon lookups are index range scans over
+``(lane_id, due_date)``.  The reminder job never polls the cards table on a
+fixed tick: after each run it asks for the earliest unsent reminder (an
+index seek on ``(reminder_sent_at, due_date)``) and re-arms itself in the
+job scheduler's heap for exactly that moment.  Because due dates are edited
+by other processes, it also wakes after ``REMINDER_REFRESH`` seconds at the
+latest to pick up new deadlines.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+import time
+from flask import current_app
+from sqlalchemy import func, select, update
+from app import db
+from app.email import send_due_reminders
+from app.models import Board, Lane, Card, User
+
+
+def due_cards(board_id, status, now=None):
+    """Cards on a board that are 'overdue' or due 'soon', soonest first"""
+    now = now or datetime.utcnow()
+    query = Card.query.join(Lane).filter(Lane.board_id == board_id)
+    if status == 'overdue':
+        query = query.filter(Card.due_date < now)
+    else:
+        soon = now + timedelta(hours=current_app.config['DUE_SOON_HOURS'])
+        query = query.filter(Card.due_date >= now, Card.due_date < soon)
+    return query.order_by(Card.due_date).all()
+
+
+def _reminder_lead():
+    return timedelta(hours=current_app.config['REMINDER_LEAD_HOURS'])
+
+
+def send_pending_reminders(now=None):
+    """Email every reminder that has come due, one SMTP session per batch.
+
+    Returns the number of cards reminded.  Cards whose email could not be
+    sent keep an empty ``reminder_sent_at`` and are retried on the next run.
+    """
+    now = now or datetime.utcnow()
+    rows = db.session.execute(
+        select(Card.id, Card.title, Card.due_date, Lane.title, Board.name, User.id)
+        .join(Lane, Card.lane_id == Lane.id)
+        .join(Board, Lane.board_id == Board.id)
+        .join(User, Board.user_id == User.id)
+        .where(Card.reminder_sent_at.is_(None),
+               Card.due_date.isnot(None),
+               Card.due_date <= now + _reminder_lead())
+        .order_by(Card.due_date)
+    ).all()
+    if not rows:
+        return 0
+
+    cards_by_user = defaultdict(list)
+    for card_id, title, due_date, lane_title, board_name, user_id in rows:
+        cards_by_user[user_id].append({'id': card_id, 'title': title, 'due_date': due_date,
+                                       'lane': lane_title, 'board': board_name})
+    users = User.query.filter(User.id.in_(cards_by_user)).all()
+
+    sent_user_ids = send_due_reminders([(user, cards_by_user[user.id]) for user in users])
+    sent_card_ids = [card['id'] for user_id in sent_user_ids for card in cards_by_user[user_id]]
+    if sent_card_ids:
+        db.session.execute(update(Card).where(Card.id.in_(sent_card_ids))
+                           .values(reminder_sent_at=now))
+    db.session.commit()
+    return len(sent_card_ids)
+
+
+def next_reminder_at(now=None):
+    """UNIX timestamp of the earliest reminder not yet due, or None"""
+    now = now or datetime.utcnow()
+    lead = _reminder_lead()
+    next_due = db.session.execute(
+        select(func.min(Card.due_date))
+        .where(Card.reminder_sent_at.is_(None), Card.due_date > now + lead)
+    ).scalar()
+    if next_due is None:
+        return None
+    return time.time() + ((next_due - lead) - now).total_seconds()
+
+
+def schedule_reminders(scheduler):
+    """Send due reminders now and re-arm at the next deadline"""
+    def run():
+        # A failed run (say, "database is locked") is logged by the scheduler
+        # and retried after REMINDER_REFRESH rather than ending the reminders
+        wake_at = time.time() + current_app.config['REMINDER_REFRESH']
+        try:
+            count = send_pending_reminders()
+            if count:
+                current_app.logger.info(f"Sent due-date reminders for {count} cards")
+
+            next_at = next_reminder_at()
+            if next_at is not None:
+                wake_at = min(wake_at, next_at)
+        finally:
+            scheduler.schedule(wake_at, run)
+
+    return scheduler.schedule(time.time(), run)
@@ -1,21 +1,51 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from datetime import datetime
+from flask import (Blueprint, render_template, request, jsonify, session, redirect, url_for, current_app, abort,
+                   get_template_attribute)
 from flask_login import login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
-from app.models import Board, Lane, Card, Category
+from app.models import Board, Lane, Card, Category, ArchivedCard, Attachment, CardTransition, LaneDailyFlow
+from app.cloning import clone_board
+from app.archive import restore_card
+from app.analytics import board_analytics, record_transition, record_lane_transitions
+from app.stats import board_stats, stats_version
+from app.wip import WipLimitReached, insert_card, insert_cards, move_card_to_lane
+from app.bulk import (CATEGORY_MODES, bulk_archive, bulk_delete, bulk_move, bulk_set_categories,
+                      card_owners)
+from app.reminders import due_cards
+from app.markup import card_description_html
+from app.concurrency import conflict_response, precondition_failed, with_version
+from app.attachments import (AttachmentTooLarge, add_attachment, attachment_hashes, attachment_response,
+                             collect_garbage)
+from app.pagination import keyset_page
+from app.dashboard import SORT_COLUMNS as DASHBOARD_SORT, dashboard_query
+from app.projections import board_lanes, category_views
 
 bp = Blueprint('main', __name__)
 
+# Board list orderings: (unique sort key, descending); each has a matching index
+BOARD_SORTS = {
+    'recent': ((Board.last_used_at, Board.id), True),
+    'name': ((Board.name, Board.id), False),
+}
+
+def render_card(card):
+    """A card's board markup, from the compiled macro without a template context"""
+    return get_template_attribute('partials/macros.html', 'render_card')(card)
+
 def get_current_board():
     """Get the current board from session or return the first board owned by current user"""
     board_id = session.get('current_board_id')
 
     if board_id:
-        board = Board.query.filter_by(id=board_id, user_id=current_user.id).first()
+        board = Board.query.filter_by(id=board_id, user_id=current_user.id, is_template=False).first()
         if board:
             return board
 
-    # If no board in session or board doesn't exist, get the first board for this user
-    board = Board.query.filter_by(user_id=current_user.id).first()
+    # If no board in session or board doesn't exist, get the most recently used board
+    board = Board.query.filter_by(user_id=current_user.id, is_template=False).order_by(
+        Board.last_used_at.desc(), Board.id.desc()).first()
     if board:
         session['current_board_id'] = board.id
     return board
@@ -29,15 +59,66 @@ def index():
     if not current_board:
         # No boards exist, redirect to create one
         return render_template('index.html', lanes=[], categories=Category.query.all(),
-                             boards=[], current_board=None)
+                             templates=[], current_board=None)
 
-    lanes = Lane.query.filter_by(board_id=current_board.id).order_by(Lane.position).all()
-    categories = Category.query.all()
-    # Only show boards owned by current user
-    boards = Board.query.filter_by(user_id=current_user.id).all()
+    # The page only reads these, so build light views instead of ORM objects
+    categories = category_views()
+    lanes = board_lanes(current_board.id, categories)
+    # The board switcher and board list page themselves in via /boards
+    templates = Board.query.filter_by(user_id=current_user.id, is_template=True).all()
 
-    return render_template('index.html', lanes=lanes, categories=categories,
-                         boards=boards, current_board=current_board)
+    return render_template('index.html', lanes=lanes, categories=list(categories.values()),
+                         templates=templates, current_board=current_board)
+
+@bp.route('/boards', methods=['GET'])
+@login_required
+def list_boards():
+    """One page of the current user's boards, for the switcher or the board manager"""
+    sort = request.args.get('sort', 'recent')
+    if sort not in BOARD_SORTS:
+        return 'Sort must be recent or name', 400
+    view = 'board_rows' if request.args.get('view') == 'manage' else 'board_switcher'
+    search = request.args.get('q', '').strip()
+
+    query = Board.query.filter_by(user_id=current_user.id, is_template=False)
+    if search:
+        query = query.filter(Board.name.contains(search, autoescape=True))
+
+    columns, descending = BOARD_SORTS[sort]
+    try:
+        boards, next_cursor = keyset_page(query, columns, request.args.get('cursor'),
+                                          limit=current_app.config['BOARD_PAGE_SIZE'],
+                                          descending=descending)
+    except ValueError:
+        return 'Invalid cursor', 400
+
+    return render_template(f'partials/{view}.html', boards=boards, next_cursor=next_cursor,
+                           sort=sort, search=search, current_board_id=session.get('current_board_id'))
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Cards across all of the user's boards, filtered by lane title and category"""
+    lane_pattern = request.args.get('lane', '').strip()
+    category_id = request.args.get('category', type=int)
+    cursor = request.args.get('cursor')
+
+    query = dashboard_query(current_user.id, lane_pattern=lane_pattern, category_id=category_id)
+    try:
+        cards, next_cursor = keyset_page(query, DASHBOARD_SORT, cursor,
+                                         limit=current_app.config['DASHBOARD_PAGE_SIZE'],
+                                         descending=True)
+    except ValueError:
+        return 'Invalid cursor', 400
+
+    filters = {'lane': lane_pattern or None, 'category': category_id}
+    if cursor:
+        # Later pages are appended by the infinite-scroll row
+        return render_template('partials/dashboard_cards.html', cards=cards,
+                               next_cursor=next_cursor, filters=filters)
+
+    return render_template('dashboard.html', cards=cards, next_cursor=next_cursor, filters=filters,
+                           categories=Category.query.all(), current_board=get_current_board())
 
 # Board routes
 @bp.route('/boards', methods=['POST'])
@@ -47,12 +128,21 @@ def create_board():
     name = request.form.get('name', '').strip()
     description = request.form.get('description', '').strip()
     color = request.form.get('color', '#3B82F6').strip()
+    template_id = request.form.get('template_id', type=int)
 
     if not name:
         return 'Name is required', 400
 
-    board = Board(name=name, description=description, color=color, user_id=current_user.id)
-    db.session.add(board)
+    if template_id:
+        # Start from a saved template: copy its lanes and cards server-side
+        template = Board.query.filter_by(id=template_id, user_id=current_user.id,
+                                         is_template=True).first_or_404()
+        board = clone_board(template, name, current_user.id,
+                            description=description or None)
+    else:
+        board = Board(name=name, description=description, color=color, user_id=current_user.id)
+        db.session.add(board)
+    board.last_used_at = datetime.utcnow()
     db.session.commit()
 
     # Switch to the new board
@@ -65,13 +155,15 @@ def create_board():
 def get_board(board_id):
     """Get board details"""
     board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
-    return jsonify(board.to_dict())
+    return with_version(jsonify(board.to_dict()), board)
 
 @bp.route('/boards/<int:board_id>/update', methods=['POST'])
 @login_required
 def update_board(board_id):
     """Update board details"""
     board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+    if precondition_failed(board):
+        return conflict_response(board)
 
     name = request.form.get('name', '').strip()
     description = request.form.get('description', '').strip()
@@ -84,7 +176,11 @@ def update_board(board_id):
     if color:
         board.color = color
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return conflict_response(Board.query.get_or_404(board_id))
 
     return redirect(url_for('main.index'))
 
@@ -95,16 +191,27 @@ def delete_board(board_id):
     board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
 
     # Don't delete if it's the only board for this user
-    if Board.query.filter_by(user_id=current_user.id).count() <= 1:
+    if not board.is_template and \
+            Board.query.filter_by(user_id=current_user.id, is_template=False).count() <= 1:
         return 'Cannot delete the only board', 400
 
     # If deleting the current board, switch to another one
     if session.get('current_board_id') == board_id:
-        other_board = Board.query.filter(Board.id != board_id, Board.user_id == current_user.id).first()
+        other_board = Board.query.filter(Board.id != board_id, Board.user_id == current_user.id,
+                                         Board.is_template == False).first()
         if other_board:
             session['current_board_id'] = other_board.id
 
+    # History tables are not ORM relationships; clear them in bulk
+    archived_ids = select(ArchivedCard.id).where(ArchivedCard.board_id == board.id)
+    card_ids = select(Card.id).join(Lane).where(Lane.board_id == board.id)
+    hashes = attachment_hashes(card_ids=card_ids) | attachment_hashes(archived_card_ids=archived_ids)
+    Attachment.query.filter(Attachment.archived_card_id.in_(archived_ids)).delete(synchronize_session=False)
+    for model in (ArchivedCard, CardTransition, LaneDailyFlow):
+        model.query.filter_by(board_id=board.id).delete(synchronize_session=False)
+
     db.session.delete(board)
+    collect_garbage(hashes)
     db.session.commit()
 
     return redirect(url_for('main.index'))
@@ -113,8 +220,40 @@ def delete_board(board_id):
 @login_required
 def switch_board(board_id):
     """Switch to a different board"""
-    board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+    board = Board.query.filter_by(id=board_id, user_id=current_user.id, is_template=False).first_or_404()
+    # Not an edit, so bypass the ORM flush that would bump the board's version
+    Board.query.filter_by(id=board.id).update({Board.last_used_at: datetime.utcnow()},
+                                              synchronize_session=False)
+    db.session.commit()
+    session['current_board_id'] = board.id
+    return redirect(url_for('main.index'))
+
+@bp.route('/boards/<int:board_id>/clone', methods=['POST'])
+@login_required
+def clone_board_route(board_id):
+    """Clone a board (or template) with all its lanes, cards and categories"""
+    source = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+
+    name = request.form.get('name', '').strip() or f'{source.name} (copy)'
+    board = clone_board(source, name, current_user.id)
+    board.last_used_at = datetime.utcnow()
+    db.session.commit()
+
+    # Switch to the new board
     session['current_board_id'] = board.id
+
+    return redirect(url_for('main.index'))
+
+@bp.route('/boards/<int:board_id>/template', methods=['POST'])
+@login_required
+def save_board_template(board_id):
+    """Save a copy of a board as a reusable template"""
+    source = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+
+    name = request.form.get('name', '').strip() or source.name
+    clone_board(source, name, current_user.id, is_template=True)
+    db.session.commit()
+
     return redirect(url_for('main.index'))
 
 # Lane routes
@@ -136,6 +275,7 @@ def create_lane():
     lane = Lane(title=title, position=max_position + 1, board_id=current_board.id)
 
     db.session.add(lane)
+    Board.bump_revision(current_board.id)
     db.session.commit()
 
     return redirect(url_for('main.index'))
@@ -148,21 +288,60 @@ def delete_lane(lane_id):
     # Verify the lane belongs to a board owned by current user
     if lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
+    record_lane_transitions(lane_ids=[lane.id], arriving=False)
+    Board.bump_revision(lane.board_id)
+    hashes = attachment_hashes(card_ids=select(Card.id).where(Card.lane_id == lane.id))
     db.session.delete(lane)
+    collect_garbage(hashes)
     db.session.commit()
     return '', 200
 
+@bp.route('/lanes/<int:lane_id>/update', methods=['POST'])
+@login_required
+def update_lane(lane_id):
+    """Update lane title and WIP limit"""
+    lane = Lane.query.get_or_404(lane_id)
+    # Verify the lane belongs to a board owned by current user
+    if lane.board.user_id != current_user.id:
+        return 'Unauthorized', 403
+    if precondition_failed(lane):
+        return conflict_response(lane)
+
+    title = request.form.get('title', '').strip()
+    if title:
+        lane.title = title
+
+    if 'wip_limit' in request.form:
+        # An empty value removes the limit
+        wip_limit = request.form.get('wip_limit', '').strip()
+        if wip_limit and (not wip_limit.isdigit() or int(wip_limit) < 1):
+            return 'WIP limit must be a positive number', 400
+        lane.wip_limit = int(wip_limit) if wip_limit else None
+
+    try:
+        Board.bump_revision(lane.board_id)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return conflict_response(Lane.query.get_or_404(lane_id))
+
+    return with_version(jsonify(lane.to_dict()), lane)
+
 @bp.route('/lanes/reorder', methods=['PUT'])
 @login_required
 def reorder_lanes():
     """Update lane positions after drag and drop"""
     lane_ids = request.json.get('lane_ids', [])
 
+    board_ids = set()
     for index, lane_id in enumerate(lane_ids):
         lane = Lane.query.get(lane_id)
         if lane and lane.board.user_id == current_user.id:
             lane.position = index
+            board_ids.add(lane.board_id)
 
+    if board_ids:
+        Board.bump_revision(*board_ids)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -170,33 +349,97 @@ def reorder_lanes():
 @bp.route('/cards', methods=['POST'])
 @login_required
 def create_card():
-    """Create a new card"""
-    title = request.form.get('title', '').strip()
+    """Create a new card, or one card per title when several are posted"""
+    # A multi-line paste into the add-card form posts every line as a title
+    titles = [title.strip() for title in request.form.getlist('title') if title.strip()]
     lane_id = request.form.get('lane_id', type=int)
     category_ids = request.form.getlist('category_ids', type=int)
 
-    if not title or not lane_id:
+    if not titles or not lane_id:
         return 'Title and lane are required', 400
+    if len(titles) > current_app.config['BULK_MAX_CARDS']:
+        return f"At most {current_app.config['BULK_MAX_CARDS']} cards can be added at once", 400
 
     lane = Lane.query.get_or_404(lane_id)
     # Verify the lane belongs to a board owned by current user
     if lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
 
-    # Get the maximum position in this lane and add 1
-    max_position = db.session.query(db.func.max(Card.position)).filter_by(lane_id=lane_id).scalar() or 0
-
-    card = Card(title=title, lane_id=lane_id, position=max_position + 1)
+    # Insert at the end of the lane, atomically checked against the WIP limit
+    try:
+        if len(titles) == 1:
+            card_ids = [insert_card(lane, titles[0])]
+        else:
+            card_ids = insert_cards(lane, titles)
+    except WipLimitReached as e:
+        db.session.rollback()
+        return str(e), 409
 
     # Add categories if provided
     if category_ids:
-        categories = Category.query.filter(Category.id.in_(category_ids)).all()
-        card.categories = categories
+        bulk_set_categories(card_ids, category_ids)
 
-    db.session.add(card)
+    record_lane_transitions(card_ids=card_ids)
+    Board.bump_revision(lane.board_id)
     db.session.commit()
 
-    return render_template('partials/card.html', card=card)
+    cards = Card.query.filter(Card.id.in_(card_ids)).order_by(Card.position).all()
+    return ''.join(render_card(card) for card in cards)
+
+@bp.route('/cards/bulk', methods=['POST'])
+@login_required
+def bulk_cards():
+    """Apply one operation (move, categories, delete, archive) to many cards"""
+    data = request.get_json(silent=True) or {}
+    card_ids = data.get('card_ids')
+    operation = data.get('operation')
+
+    if (not isinstance(card_ids, list) or not card_ids
+            or not all(isinstance(card_id, int) for card_id in card_ids)):
+        return jsonify({'success': False, 'error': 'card_ids must be a list of card ids'}), 400
+    card_ids = list(dict.fromkeys(card_ids))
+    if len(card_ids) > current_app.config['BULK_MAX_CARDS']:
+        return jsonify({'success': False,
+                        'error': f"At most {current_app.config['BULK_MAX_CARDS']} cards per request"}), 400
+    if operation not in ('move', 'categories', 'delete', 'archive'):
+        return jsonify({'success': False, 'error': 'Unknown operation'}), 400
+
+    # One query checks that every card exists and belongs to the current user
+    owners = card_owners(card_ids)
+    if len(owners) != len(card_ids):
+        return jsonify({'success': False, 'error': 'Card not found'}), 404
+    if any(user_id != current_user.id for _, user_id in owners.values()):
+        return 'Unauthorized', 403
+    board_ids = {board_id for board_id, _ in owners.values()}
+
+    if operation == 'move':
+        lane_id = data.get('lane_id')
+        if not isinstance(lane_id, int):
+            return jsonify({'success': False, 'error': 'lane_id is required'}), 400
+        lane = Lane.query.get_or_404(lane_id)
+        if lane.board.user_id != current_user.id:
+            return 'Unauthorized', 403
+        try:
+            bulk_move(card_ids, lane)
+        except WipLimitReached as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 409
+        board_ids.add(lane.board_id)
+    elif operation == 'categories':
+        category_ids = data.get('category_ids', [])
+        mode = data.get('mode', 'set')
+        if (mode not in CATEGORY_MODES or not isinstance(category_ids, list)
+                or not all(isinstance(category_id, int) for category_id in category_ids)):
+            return jsonify({'success': False, 'error': 'Invalid categories'}), 400
+        bulk_set_categories(card_ids, category_ids, mode)
+    elif operation == 'delete':
+        bulk_delete(card_ids)
+    else:
+        bulk_archive(card_ids)
+
+    Board.bump_revision(*board_ids)
+    db.session.commit()
+    return jsonify({'success': True, 'updated': len(card_ids)})
 
 @bp.route('/cards/<int:card_id>', methods=['GET'])
 @login_required
@@ -207,7 +450,8 @@ def get_card(card_id):
     if card.lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
     categories = Category.query.all()
-    return render_template('partials/card_modal.html', card=card, all_categories=categories)
+    return with_version(render_template('partials/card_modal.html', card=card, all_categories=categories,
+                                        description_html=card_description_html(card)), card)
 
 @bp.route('/cards/<int:card_id>/update', methods=['POST'])
 @login_required
@@ -217,26 +461,47 @@ def update_card(card_id):
     # Verify the card belongs to a board owned by current user
     if card.lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
+    if precondition_failed(card):
+        return conflict_response(card)
 
     title = request.form.get('title', '').strip()
     description = request.form.get('description', '').strip()
     category_ids = request.form.getlist('category_ids', type=int)
 
-    if title:
-        card.title = title
-    if description is not None:
-        card.description = description
-
-    # Update categories
+    # Update categories first: loading them autoflushes, and a flush per
+    # change would bump the card's version more than once per save
     if category_ids:
         categories = Category.query.filter(Category.id.in_(category_ids)).all()
         card.categories = categories
     else:
         card.categories = []
 
-    db.session.commit()
+    if title:
+        card.title = title
+    if description is not None:
+        card.description = description
 
-    return render_template('partials/card.html', card=card)
+    if 'due_date' in request.form:
+        due_date = request.form.get('due_date', '').strip()
+        try:
+            due_date = datetime.fromisoformat(due_date) if due_date else None
+        except ValueError:
+            return 'Invalid due date', 400
+        if due_date != card.due_date:
+            card.due_date = due_date
+            card.reminder_sent_at = None
+
+    # Always write the row, so a categories-only edit bumps the version too
+    card.updated_at = datetime.utcnow()
+    try:
+        # Flushes the edit; StaleDataError if the row changed since it was read
+        Board.bump_revision(card.lane.board_id)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return conflict_response(Card.query.get_or_404(card_id))
+
+    return with_version(render_card(card), card)
 
 @bp.route('/cards/<int:card_id>', methods=['PUT'])
 @login_required
@@ -252,7 +517,12 @@ def delete_card(card_id):
     # Verify the card belongs to a board owned by current user
     if card.lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
+    record_transition(card, card.lane.board_id, card.lane_id, None)
+    Board.bump_revision(card.lane.board_id)
+    hashes = attachment_hashes(card_ids=[card.id])
     db.session.delete(card)
+    # Blobs no other attachment uses go with the card
+    collect_garbage(hashes)
     db.session.commit()
     return '', 200
 
@@ -264,18 +534,40 @@ def move_card(card_id):
     # Verify the card belongs to a board owned by current user
     if card.lane.board.user_id != current_user.id:
         return 'Unauthorized', 403
+    if precondition_failed(card):
+        return conflict_response(card)
 
     new_lane_id = request.json.get('lane_id')
     new_position = request.json.get('position')
 
     if new_lane_id:
-        card.lane_id = int(new_lane_id)
-    if new_position is not None:
+        lane = Lane.query.get_or_404(int(new_lane_id))
+        # Verify the target lane belongs to a board owned by current user
+        if lane.board.user_id != current_user.id:
+            return 'Unauthorized', 403
+
+        previous_lane_id = card.lane_id
+        try:
+            move_card_to_lane(card, lane, float(new_position) if new_position is not None else None,
+                              version=card.version)
+        except WipLimitReached as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 409
+        except StaleDataError:
+            db.session.rollback()
+            return conflict_response(Card.query.get_or_404(card_id))
+        record_transition(card, lane.board_id, previous_lane_id, lane.id)
+    elif new_position is not None:
         card.position = float(new_position)
 
-    db.session.commit()
+    try:
+        Board.bump_revision(card.lane.board_id)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return conflict_response(Card.query.get_or_404(card_id))
 
-    return jsonify({'success': True})
+    return with_version(jsonify({'success': True, 'version': card.version}), card)
 
 @bp.route('/cards/reorder', methods=['PUT'])
 @login_required
@@ -283,6 +575,7 @@ def reorder_cards():
     """Reorder cards within a lane or across lanes"""
     updates = request.json.get('updates', [])
 
+    board_ids = set()
     for update in updates:
         card_id = update.get('card_id')
         lane_id = update.get('lane_id')
@@ -291,13 +584,160 @@ def reorder_cards():
         card = Card.query.get(card_id)
         if card and card.lane.board.user_id == current_user.id:
             if lane_id is not None:
-                card.lane_id = lane_id
-            if position is not None:
+                lane = Lane.query.get(lane_id)
+                if not lane or lane.board.user_id != current_user.id:
+                    continue
+
+                previous_lane_id = card.lane_id
+                try:
+                    move_card_to_lane(card, lane, position)
+                except WipLimitReached as e:
+                    # All or nothing: a full lane rejects the whole reorder
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': str(e)}), 409
+                record_transition(card, lane.board_id, previous_lane_id, lane.id)
+            elif position is not None:
                 card.position = position
+            board_ids.add(card.lane.board_id)
 
+    if board_ids:
+        Board.bump_revision(*board_ids)
     db.session.commit()
     return jsonify({'success': True})
 
+# Attachment routes
+def _owned_attachment(attachment_id):
+    """The attachment with its card's owner, in one query (404 if archived or missing)"""
+    row = db.session.execute(
+        select(Attachment, Board.user_id)
+        .join(Card, Attachment.card_id == Card.id)
+        .join(Lane, Card.lane_id == Lane.id)
+        .join(Board, Lane.board_id == Board.id)
+        .where(Attachment.id == attachment_id)
+    ).first()
+    if row is None:
+        abort(404)
+    if row.user_id != current_user.id:
+        abort(403)
+    return row.Attachment
+
+@bp.route('/cards/<int:card_id>/attachments', methods=['POST'])
+@login_required
+def upload_attachment(card_id):
+    """Attach a file to a card; the request body is the file itself"""
+    card = Card.query.get_or_404(card_id)
+    # Verify the card belongs to a board owned by current user
+    if card.lane.board.user_id != current_user.id:
+        return 'Unauthorized', 403
+
+    # Keep only the last path component of whatever the client sent
+    filename = request.args.get('filename', '').replace('\\', '/').rsplit('/', 1)[-1].strip()[:255]
+    if not filename:
+        return 'A filename is required', 400
+    max_size = current_app.config['ATTACHMENT_MAX_SIZE']
+    if request.content_length is not None and request.content_length > max_size:
+        return str(AttachmentTooLarge(max_size)), 413
+
+    try:
+        attachment = add_attachment(card, filename, request.mimetype or 'application/octet-stream',
+                                    request.stream)
+    except AttachmentTooLarge as e:
+        db.session.rollback()
+        return str(e), 413
+    db.session.commit()
+
+    return render_template('partials/attachment.html', attachment=attachment), 201
+
+@bp.route('/attachments/<int:attachment_id>', methods=['GET'])
+@login_required
+def download_attachment(attachment_id):
+    """Download an attachment (supports Range requests)"""
+    return attachment_response(_owned_attachment(attachment_id))
+
+@bp.route('/attachments/<int:attachment_id>', methods=['DELETE'])
+@login_required
+def delete_attachment(attachment_id):
+    """Remove an attachment, and its blob if no other attachment shares it"""
+    attachment = _owned_attachment(attachment_id)
+    db.session.delete(attachment)
+    collect_garbage([attachment.sha256])
+    db.session.commit()
+    return '', 200
+
+@bp.route('/boards/<int:board_id>/stats', methods=['GET'])
+@login_required
+def get_board_stats(board_id):
+    """Card counts per lane, per category and by age for the board header"""
+    board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+
+    # Dashboards poll this; unchanged boards answer 304 without touching the cache
+    response = jsonify(board_stats(board))
+    response.set_etag(stats_version(board))
+    return response.make_conditional(request)
+
+@bp.route('/boards/<int:board_id>/due', methods=['GET'])
+@login_required
+def get_due_cards(board_id):
+    """Overdue or due-soon cards on a board"""
+    board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+    status = request.args.get('status', 'overdue')
+    if status not in ('overdue', 'soon'):
+        return 'Status must be overdue or soon', 400
+    return jsonify([card.to_dict() for card in due_cards(board.id, status)])
+
+@bp.route('/boards/<int:board_id>/analytics', methods=['GET'])
+@login_required
+def get_board_analytics(board_id):
+    """Cumulative flow, throughput and cycle time for a board"""
+    board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    return jsonify(board_analytics(board, days=days))
+
+# Archive routes
+@bp.route('/boards/<int:board_id>/archive', methods=['GET'])
+@login_required
+def get_archive(board_id):
+    """List a board's archived cards, newest first (keyset paginated by id)"""
+    board = Board.query.filter_by(id=board_id, user_id=current_user.id).first_or_404()
+    before = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', current_app.config['ARCHIVE_PAGE_SIZE'], type=int), 1), 200)
+
+    query = ArchivedCard.query.filter_by(board_id=board.id)
+    if before:
+        query = query.filter(ArchivedCard.id < before)
+    archived = query.order_by(ArchivedCard.id.desc()).limit(limit).all()
+
+    return jsonify({
+        'cards': [card.to_dict() for card in archived],
+        'next_before': archived[-1].id if len(archived) == limit else None
+    })
+
+@bp.route('/archive/<int:archived_id>/restore', methods=['POST'])
+@login_required
+def restore_archived_card(archived_id):
+    """Move an archived card back onto its board"""
+    archived = ArchivedCard.query.get_or_404(archived_id)
+    board = Board.query.filter_by(id=archived.board_id, user_id=current_user.id).first()
+    if not board:
+        return 'Unauthorized', 403
+
+    # Restore into the requested lane, the original lane, or the board's first lane
+    lane_id = request.form.get('lane_id', type=int) or archived.lane_id
+    lane = Lane.query.filter_by(id=lane_id, board_id=board.id).first() or \
+        Lane.query.filter_by(board_id=board.id).order_by(Lane.position).first()
+    if not lane:
+        return 'Board has no lanes to restore into', 409
+
+    try:
+        card = restore_card(archived, lane)
+    except WipLimitReached as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
+    Board.bump_revision(board.id)
+    db.session.commit()
+
+    return jsonify(card.to_dict())
+
 # Category routes
 @bp.route('/categories', methods=['POST'])
 @login_required
@@ -328,5 +768,7 @@ def delete_category(category_id):
     """Delete a category"""
     category = Category.query.get_or_404(category_id)
     db.session.delete(category)
+    # Categories are shared by every board
+    Board.bump_revision()
     db.session.commit()
     return '', 200
@@ -100,12 +100,27 @@ function initializeCardDragDrop() {
                     method: 'PUT',
                     headers: {
                         'Content-Type': 'application/json',
+                        'If-Match': `"${event.item.getAttribute('data-version')}"`,
                     },
                     body: JSON.stringify({
                         lane_id: newLaneId,
                         position: positionValue
                     })
                 })
+                .then(response => {
+                    if (response.status === 409) {
+                        // Target lane is at its WIP limit, or someone else changed the card
+                        // first; the server kept the card where it was
+                        return response.json().then(result => {
+                            alert(result.error);
+                            location.reload();
+                        });
+                    }
+                    return response.json().then(result => {
+                        event.item.setAttribute('data-version', result.version);
+                        updateLaneCounts();
+                    });
+                })
                 .catch(error => {
                     console.error('Error moving card:', error);
                     alert('Failed to save card position. Please refresh the page.');
@@ -117,6 +132,204 @@ function initializeCardDragDrop() {
     });
 }
 
+// Refresh the "cards / WIP limit" counters in lane headers
+function updateLaneCounts() {
+    document.querySelectorAll('.lane').forEach(lane => {
+        const counter = lane.querySelector('.lane-count');
+        if (!counter) return;
+
+        const count = lane.querySelectorAll('.lane-cards .card').length;
+        const limit = parseInt(counter.getAttribute('data-wip-limit'));
+        counter.textContent = limit ? `${count} / ${limit}` : `${count}`;
+        counter.classList.toggle('lane-full', Boolean(limit) && count >= limit);
+    });
+}
+
+function setLaneWipLimit(laneId, currentLimit) {
+    const limit = prompt('WIP limit for this lane (leave empty for no limit):', currentLimit);
+    if (limit === null) {
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('wip_limit', limit.trim());
+    const lane = document.querySelector(`.lane[data-lane-id="${laneId}"]`);
+
+    fetch(`/lanes/${laneId}/update`, {
+        method: 'POST',
+        headers: {
+            'If-Match': `"${lane.getAttribute('data-version')}"`,
+        },
+        body: formData
+    })
+    .then(response => {
+        if (response.ok) {
+            location.reload();
+        } else if (response.status === 409) {
+            // Someone else changed the lane; show its current state
+            return response.json().then(result => {
+                alert(result.error);
+                location.reload();
+            });
+        } else {
+            return response.text().then(message => alert(message));
+        }
+    })
+    .catch(error => {
+        console.error('Error updating lane:', error);
+        alert('Failed to update lane.');
+    });
+}
+
+// Show server-side rejections (such as a full lane) from HTMX requests
+document.addEventListener('htmx:responseError', function(event) {
+    const xhr = event.detail.xhr;
+    if (xhr.status === 409 && xhr.getResponseHeader('Content-Type') === 'application/json') {
+        // Edit conflict: the response carries the card's current state
+        const result = JSON.parse(xhr.responseText);
+        alert(result.error);
+        if (result.card) {
+            openCardModal(result.card.id);
+        }
+        return;
+    }
+    alert(xhr.responseText || 'Request failed.');
+});
+
+// Keep lane counters current after HTMX adds or removes cards
+document.addEventListener('htmx:afterSettle', function() {
+    updateLaneCounts();
+});
+
+// Multi-select: Ctrl/Cmd/Shift-click selects cards for the bulk toolbar;
+// once something is selected a plain click toggles too
+const selectedCards = new Set();
+
+function cardClicked(event, cardId) {
+    if (event.ctrlKey || event.metaKey || event.shiftKey || selectedCards.size > 0) {
+        toggleCardSelection(cardId);
+    } else {
+        openCardModal(cardId);
+    }
+}
+
+function toggleCardSelection(cardId) {
+    if (selectedCards.has(cardId)) {
+        selectedCards.delete(cardId);
+    } else {
+        selectedCards.add(cardId);
+    }
+    updateBulkToolbar();
+}
+
+function clearCardSelection() {
+    selectedCards.clear();
+    updateBulkToolbar();
+}
+
+function updateBulkToolbar() {
+    document.querySelectorAll('.card').forEach(card => {
+        const cardId = parseInt(card.getAttribute('data-card-id'));
+        card.classList.toggle('card-selected', selectedCards.has(cardId));
+    });
+
+    const toolbar = document.getElementById('bulk-toolbar');
+    if (!toolbar) return;
+    toolbar.style.display = selectedCards.size ? 'flex' : 'none';
+    document.getElementById('bulk-count').textContent =
+        `${selectedCards.size} card${selectedCards.size === 1 ? '' : 's'} selected`;
+}
+
+// Selected card ids in board order, so moved cards keep their order
+function selectedCardIds() {
+    return Array.from(document.querySelectorAll('.card'))
+        .map(card => parseInt(card.getAttribute('data-card-id')))
+        .filter(cardId => selectedCards.has(cardId));
+}
+
+function bulkCardAction(operation, options) {
+    fetch('/cards/bulk', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(Object.assign({ card_ids: selectedCardIds(), operation: operation }, options))
+    })
+    .then(response => {
+        if (response.ok) {
+            location.reload();
+        } else if (response.headers.get('Content-Type') === 'application/json') {
+            // Nothing was changed, e.g. the target lane is at its WIP limit
+            return response.json().then(result => alert(result.error));
+        } else {
+            return response.text().then(message => alert(message));
+        }
+    })
+    .catch(error => {
+        console.error(`Error applying ${operation} to cards:`, error);
+        alert('Failed to update the selected cards.');
+    });
+}
+
+function bulkMove() {
+    bulkCardAction('move', { lane_id: parseInt(document.getElementById('bulk-lane').value) });
+}
+
+function bulkSetCategories() {
+    const categoryIds = Array.from(document.getElementById('bulk-categories').selectedOptions)
+        .map(option => parseInt(option.value));
+    bulkCardAction('categories', { category_ids: categoryIds, mode: 'set' });
+}
+
+function bulkArchive() {
+    if (confirm(`Archive ${selectedCards.size} selected cards?`)) {
+        bulkCardAction('archive', {});
+    }
+}
+
+function bulkDelete() {
+    if (confirm(`Delete ${selectedCards.size} selected cards?`)) {
+        bulkCardAction('delete', {});
+    }
+}
+
+// Pasting several lines into an add-card field creates one card per line
+// with a single request (the server inserts them in one statement)
+function pasteCardTitles(event, form) {
+    const text = (event.clipboardData || window.clipboardData).getData('text');
+    const titles = text.split(/\r?\n/).map(line => line.trim()).filter(line => line);
+    if (titles.length < 2) {
+        return;
+    }
+    event.preventDefault();
+
+    const laneId = form.querySelector('input[name="lane_id"]').value;
+    const formData = new FormData();
+    formData.append('lane_id', laneId);
+    titles.forEach(title => formData.append('title', title));
+
+    fetch('/cards', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.text().then(html => {
+        if (!response.ok) {
+            alert(html);
+            return;
+        }
+        const laneCards = document.getElementById(`lane-cards-${laneId}`);
+        laneCards.insertAdjacentHTML('beforeend', html);
+        htmx.process(laneCards);
+        form.reset();
+        initializeDragAndDrop();
+        updateLaneCounts();
+    }))
+    .catch(error => {
+        console.error('Error adding cards:', error);
+        alert('Failed to add cards.');
+    });
+}
+
 // Card Modal Functions
 function openCardModal(cardId) {
     const modal = document.getElementById('card-modal');
@@ -137,6 +350,37 @@ function openCardModal(cardId) {
         });
 }
 
+// Each file is sent as the raw request body, which the server streams to disk;
+// files upload one after another in the order chosen
+function uploadAttachments(cardId, input) {
+    const list = document.getElementById(`attachments-${cardId}`);
+
+    Array.from(input.files).reduce((previous, file) => previous.then(() =>
+        fetch(`/cards/${cardId}/attachments?filename=${encodeURIComponent(file.name)}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': file.type || 'application/octet-stream',
+            },
+            body: file
+        })
+        .then(response => response.text().then(html => {
+            if (!response.ok) {
+                alert(html);
+                return;
+            }
+            list.insertAdjacentHTML('beforeend', html);
+            htmx.process(list.lastElementChild);
+        }))
+        .catch(error => {
+            console.error('Error uploading attachment:', error);
+            alert(`Failed to upload ${file.name}.`);
+        })
+    ), Promise.resolve())
+    .then(() => {
+        input.value = '';
+    });
+}
+
 function closeCardModal() {
     const modal = document.getElementById('card-modal');
     modal.style.display = 'none';
@@ -241,6 +485,78 @@ function deleteCategory(categoryId) {
     });
 }
 
+// Archive Modal Functions
+function openArchiveModal(boardId) {
+    const modal = document.getElementById('archive-modal');
+    document.getElementById('archive-list').innerHTML = '';
+    loadArchive(boardId, null);
+    modal.style.display = 'flex';
+    return false;
+}
+
+function closeArchiveModal() {
+    const modal = document.getElementById('archive-modal');
+    modal.style.display = 'none';
+    return false;
+}
+
+function loadArchive(boardId, before) {
+    const url = before ? `/boards/${boardId}/archive?before=${before}` : `/boards/${boardId}/archive`;
+
+    fetch(url)
+        .then(response => response.json())
+        .then(page => {
+            const archiveList = document.getElementById('archive-list');
+            page.cards.forEach(card => {
+                // Titles are user input: set them as text, never as HTML
+                const row = document.createElement('tr');
+                row.style.borderBottom = '1px solid #E2E8F0';
+                row.innerHTML = `
+                    <td style="padding: 0.5rem;">
+                        <strong></strong>
+                        <div style="font-size: 0.875rem; color: #64748B;"></div>
+                    </td>
+                    <td style="padding: 0.5rem; text-align: right;">
+                        <button type="button" class="secondary" style="font-size: 0.875rem; padding: 0.25rem 0.75rem;">Restore</button>
+                    </td>
+                `;
+                row.querySelector('strong').textContent = card.title;
+                row.querySelector('div').textContent = `${card.lane_title} · archived ${card.archived_at.slice(0, 10)}`;
+                row.querySelector('button').onclick = () => restoreArchivedCard(card.id);
+                archiveList.appendChild(row);
+            });
+
+            // Keyset pagination: ask for cards older than the last one shown
+            const more = document.getElementById('archive-more');
+            more.style.display = page.next_before ? 'inline-block' : 'none';
+            more.onclick = () => loadArchive(boardId, page.next_before);
+        })
+        .catch(error => {
+            console.error('Error loading archive:', error);
+        });
+}
+
+function restoreArchivedCard(archivedId) {
+    fetch(`/archive/${archivedId}/restore`, {
+        method: 'POST'
+    })
+    .then(response => {
+        if (response.ok) {
+            // Reload the page to show the restored card
+            location.reload();
+        } else if (response.status === 409) {
+            // The lane is at its WIP limit; the card stays archived
+            return response.json().then(result => alert(result.error));
+        } else {
+            throw new Error('Failed to restore card');
+        }
+    })
+    .catch(error => {
+        console.error('Error restoring card:', error);
+        alert('Failed to restore card.');
+    });
+}
+
 // Lane Modal Functions
 function openLaneModal() {
     const modal = document.getElementById('lane-modal');
@@ -258,6 +574,8 @@ function closeLaneModal() {
 function openBoardModal() {
     const modal = document.getElementById('board-modal');
     modal.style.display = 'flex';
+    // The board list is only fetched the first time the modal opens
+    htmx.trigger('#boards-list-rows', 'board-modal-open');
     return false;
 }
 
@@ -306,14 +624,25 @@ function saveBoard(boardId) {
     formData.append('name', name);
     formData.append('description', description);
 
+    const row = document.getElementById(`board-row-${boardId}`);
+
     fetch(`/boards/${boardId}/update`, {
         method: 'POST',
+        headers: {
+            'If-Match': `"${row.getAttribute('data-version')}"`,
+        },
         body: formData
     })
     .then(response => {
         if (response.ok) {
             // Reload the page to show updated board
             location.reload();
+        } else if (response.status === 409) {
+            // Someone else changed the board since the list was loaded
+            return response.json().then(result => {
+                alert(result.error);
+                location.reload();
+            });
         } else {
             throw new Error('Failed to update board');
         }
@@ -324,6 +653,42 @@ function saveBoard(boardId) {
     });
 }
 
+function cloneBoard(boardId) {
+    const name = prompt('Name for the new board (leave empty for a default name):');
+    if (name === null) {
+        return;
+    }
+
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = `/boards/${boardId}/clone`;
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = 'name';
+    input.value = name.trim();
+    form.appendChild(input);
+    document.body.appendChild(form);
+    form.submit();
+}
+
+function saveBoardAsTemplate(boardId) {
+    const name = prompt('Template name (leave empty to reuse the board name):');
+    if (name === null) {
+        return;
+    }
+
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = `/boards/${boardId}/template`;
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = 'name';
+    input.value = name.trim();
+    form.appendChild(input);
+    document.body.appendChild(form);
+    form.submit();
+}
+
 function deleteBoard(boardId) {
     if (!confirm('Delete this board and all its lanes/cards?')) {
         return;
@@ -0,0 +1,78 @@
+"""Board header statistics.
+
+Counts per lane, per category and per age bucket are each computed with a
+single GROUP BY over indexed join columns, and the result is cached per
+worker against the board's revision so repeated polls are dictionary
+lookups.
+"""
+from datetime import datetime
+from sqlalchemy import case, func, literal, select
+from app import db
+from app.cache import LRUCache
+from app.models import Lane, Card, Category, card_categories
+
+# Upper bounds (in days) of the age buckets; cards older than the last one fall in "older"
+AGE_BUCKETS = [('today', 1), ('this_week', 7), ('this_month', 30)]
+
+stats_cache = LRUCache('board_stats', maxsize=512)
+
+
+def _compute_board_stats(board_id, now):
+    lanes = Lane.__table__
+    cards = Card.__table__
+
+    lane_counts = db.session.execute(
+        select(lanes.c.id, lanes.c.title, func.count(cards.c.id))
+        .select_from(lanes)
+        .outerjoin(cards, cards.c.lane_id == lanes.c.id)
+        .where(lanes.c.board_id == board_id)
+        .group_by(lanes.c.id, lanes.c.title, lanes.c.position)
+        .order_by(lanes.c.position)
+    ).all()
+
+    category_counts = db.session.execute(
+        select(Category.id, Category.name, Category.color, func.count())
+        .select_from(cards)
+        .join(lanes, cards.c.lane_id == lanes.c.id)
+        .join(card_categories, card_categories.c.card_id == cards.c.id)
+        .join(Category, Category.id == card_categories.c.category_id)
+        .where(lanes.c.board_id == board_id)
+        .group_by(Category.id, Category.name, Category.color)
+        .order_by(Category.name)
+    ).all()
+
+    age_days = func.julianday(literal(now)) - func.julianday(cards.c.created_at)
+    bucket = case(*[(age_days < limit, name) for name, limit in AGE_BUCKETS], else_='older')
+    age_counts = dict(db.session.execute(
+        select(bucket, func.count())
+        .select_from(cards)
+        .join(lanes, cards.c.lane_id == lanes.c.id)
+        .where(lanes.c.board_id == board_id)
+        .group_by(bucket)
+    ).all())
+
+    return {
+        'total': sum(count for _, _, count in lane_counts),
+        'lanes': [{'id': lane_id, 'title': title, 'count': count}
+                  for lane_id, title, count in lane_counts],
+        'categories': [{'id': cat_id, 'name': name, 'color': color, 'count': count}
+                       for cat_id, name, color, count in category_counts],
+        'ages': {name: age_counts.get(name, 0) for name in [b for b, _ in AGE_BUCKETS] + ['older']}
+    }
+
+
+def stats_version(board, now=None):
+    """Cache key and ETag for a board's stats; age buckets are refreshed at least hourly.
+
+    SQLite reuses a deleted board's id, so the creation time tells a new
+    board apart from the old one that had its id.
+    """
+    now = now or datetime.utcnow()
+    created = f'{board.created_at:%Y%m%d%H%M%S%f}' if board.created_at else '0'
+    return f'{board.id}-{created}-{board.revision}-{now:%Y%m%d%H}'
+
+
+def board_stats(board):
+    """Card counts for the board header, cached against the board revision"""
+    now = datetime.utcnow()
+    return stats_cache.get_or_set(stats_version(board, now), lambda: _compute_board_stats(board.id, now))
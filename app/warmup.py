@@ -0,0 +1,69 @@
+"""Warm-up before a preforking server forks its workers.
+
+Everything done here happens once in the master.  The workers inherit the
+results through copy-on-write instead of each paying for them on its first
+requests: compiled Jinja templates, configured ORM mappers, and the
+compiled forms of the hot board queries in the engine's statement cache.
+The queries run with ids that match nothing, so they only cost a compile.
+Pooled connections are closed again before returning, so no SQLite handle
+is shared across a fork.
+"""
+import time
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+from app import db
+from app.models import User, Board, Lane, Card, Category
+from app.projections import board_lanes, category_views
+from app.dashboard import SORT_COLUMNS as DASHBOARD_SORT, dashboard_query
+from app.pagination import keyset_page
+from app.reminders import due_cards
+from app.routes import BOARD_SORTS
+
+NO_ID = 0  # Matches no row; the statements compile all the same
+
+
+def _hot_queries(config):
+    """The statements behind the board, card modal, board switcher and dashboard"""
+    yield lambda: db.session.get(User, NO_ID)
+    yield lambda: Board.query.filter_by(id=NO_ID, user_id=NO_ID, is_template=False).first()
+    yield lambda: Board.query.filter_by(user_id=NO_ID, is_template=False).order_by(
+        Board.last_used_at.desc(), Board.id.desc()).first()
+    yield lambda: Board.query.filter_by(user_id=NO_ID, is_template=True).all()
+    yield lambda: board_lanes(NO_ID, category_views())
+    yield lambda: Category.query.all()
+    yield lambda: db.session.get(Card, NO_ID)
+    yield lambda: db.session.get(Lane, NO_ID)
+    yield lambda: db.session.get(Board, NO_ID)
+    for columns, descending in BOARD_SORTS.values():
+        yield lambda columns=columns, descending=descending: keyset_page(
+            Board.query.filter_by(user_id=NO_ID, is_template=False), columns, None,
+            limit=config['BOARD_PAGE_SIZE'], descending=descending)
+    yield lambda: keyset_page(dashboard_query(NO_ID), DASHBOARD_SORT, None,
+                              limit=config['DASHBOARD_PAGE_SIZE'], descending=True)
+    yield lambda: due_cards(NO_ID, 'overdue')
+
+
+def warm_up(app):
+    """Compile templates and hot statements; returns the seconds spent"""
+    started = time.perf_counter()
+    configure_mappers()
+
+    env = app.jinja_env
+    for name in env.list_templates(extensions=['html']):
+        env.get_template(name)
+
+    with app.app_context():
+        try:
+            for query in _hot_queries(app.config):
+                query()
+        except SQLAlchemyError as e:
+            # An unmigrated database shouldn't stop the server from starting
+            app.logger.warning(f"Skipped query warm-up: {e}")
+        db.session.rollback()
+        db.session.remove()
+        # Workers open their own connections after the fork
+        db.engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    app.logger.info(f"Warmed up in {elapsed * 1000:.0f} ms")
+    return elapsed
@@ -0,0 +1,124 @@
+"""Work-in-progress limit enforcement.
+
+A count-then-write check races between workers: two requests can both see
+a lane one card below its limit and both add a card.  Instead, the limit is
+part of the write itself -- a conditional ``INSERT ... SELECT`` or
+``UPDATE ... WHERE`` that only affects a row while the lane has room.
+SQLite runs each statement under the database write lock, so the count and
+the write are atomic with respect to every other writer.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
+from app.models import Board, Lane, Card
+
+
+class WipLimitReached(Exception):
+    """Raised when a lane has no room for another card"""
+
+    def __init__(self, lane):
+        self.lane = lane
+        super().__init__(f'Lane "{lane.title}" is at its WIP limit ({lane.wip_limit})')
+
+
+def _has_room(lane_id, incoming=1):
+    """SQL condition: the lane has no WIP limit or room for ``incoming`` more cards"""
+    lanes = Lane.__table__
+    cards = Card.__table__
+    wip_limit = select(lanes.c.wip_limit).where(lanes.c.id == lane_id).scalar_subquery()
+    card_count = select(func.count()).select_from(cards).where(cards.c.lane_id == lane_id).scalar_subquery()
+    return or_(wip_limit.is_(None), card_count + incoming <= wip_limit)
+
+
+def _lane_owner(lane_id):
+    """SQL expression: the owner of the lane's board, stored on its cards"""
+    lanes = Lane.__table__
+    boards = Board.__table__
+    return (select(boards.c.user_id)
+            .join(lanes, lanes.c.board_id == boards.c.id)
+            .where(lanes.c.id == lane_id)
+            .scalar_subquery())
+
+
+def insert_card(lane, title, description='', created_at=None, due_date=None):
+    """Insert a card at the end of a lane; returns its id.
+
+    Raises WipLimitReached if the lane is full.  The caller commits.
+    """
+    cards = Card.__table__
+    lanes = Lane.__table__
+    now = datetime.utcnow()
+    next_position = (select(func.coalesce(func.max(cards.c.position), 0) + 1)
+                     .where(cards.c.lane_id == lane.id)
+                     .scalar_subquery())
+
+    card_id = db.session.execute(insert(cards).from_select(
+        ['title', 'description', 'lane_id', 'user_id', 'position', 'due_date', 'created_at', 'updated_at'],
+        select(literal(title), literal(description), lanes.c.id, _lane_owner(lane.id), next_position,
+               literal(due_date, cards.c.due_date.type), literal(created_at or now), literal(now))
+        .where(lanes.c.id == lane.id, _has_room(lane.id))
+    ).returning(cards.c.id)).scalar()
+
+    if card_id is None:
+        raise WipLimitReached(lane)
+    return card_id
+
+
+def insert_cards(lane, titles):
+    """Insert several cards at the end of a lane, in order, in one statement.
+
+    Either every card fits under the lane's WIP limit or none is inserted
+    (WipLimitReached).  Returns the new ids in ``titles`` order.  The caller
+    commits.
+    """
+    cards = Card.__table__
+    now = datetime.utcnow()
+    # The titles travel as one JSON parameter; json_each yields them with
+    # their 0-based index, which orders the new cards
+    batch = func.json_each(json.dumps(titles)).table_valued('key', 'value').alias('batch')
+    last_position = (select(func.coalesce(func.max(cards.c.position), 0))
+                     .where(cards.c.lane_id == lane.id)
+                     .scalar_subquery())
+
+    # SQLite materialises a SELECT that reads the table being inserted into,
+    # so the count and positions are taken before the first row is written
+    rows = db.session.execute(insert(cards).from_select(
+        ['title', 'description', 'lane_id', 'user_id', 'position', 'created_at', 'updated_at'],
+        select(batch.c.value, literal(''), literal(lane.id), _lane_owner(lane.id), last_position + batch.c.key + 1,
+               literal(now), literal(now))
+        .where(_has_room(lane.id, len(titles)))
+        .order_by(batch.c.key)
+    ).returning(cards.c.id, cards.c.position)).all()
+
+    if not rows:
+        raise WipLimitReached(lane)
+    return [card_id for card_id, _ in sorted(rows, key=lambda row: row.position)]
+
+
+def move_card_to_lane(card, lane, position=None, version=None):
+    """Move a card into a lane (and optionally to a position) if the lane has room.
+
+    Moves within the card's current lane are never limited.  Raises
+    WipLimitReached if the target lane is full, or StaleDataError if
+    ``version`` is given and the card has been changed since.  The caller
+    commits.
+    """
+    cards = Card.__table__
+    values = {'lane_id': lane.id, 'updated_at': datetime.utcnow(), 'version': cards.c.version + 1}
+    if position is not None:
+        values['position'] = position
+
+    condition = and_(cards.c.id == card.id, or_(cards.c.lane_id == lane.id, _has_room(lane.id)))
+    if version is not None:
+        condition = and_(condition, cards.c.version == version)
+    result = db.session.execute(update(cards).where(condition).values(**values))
+    if result.rowcount == 0:
+        current_version = db.session.execute(select(cards.c.version).where(cards.c.id == card.id)).scalar()
+        if version is not None and current_version != version:
+            raise StaleDataError(f'Card {card.id} is no longer at version {version}')
+        raise WipLimitReached(lane)
+
+    # Keep the ORM instance in step with the row written above
+    db.session.expire(card, ['lane_id', 'lane', 'position', 'updated_at', 'version'])
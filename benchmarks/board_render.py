@@ -0,0 +1,146 @@
+"""
+Board page load-and-render benchmark
+
+Fills a throwaway database with one large board, then loads its lanes and
+cards the way index() used to (ORM objects with selectinload) and the way
+it does now (the ``app.projections`` views), and renders the lane partials
+from each.  Reports median load and render times, and the memory the loaded
+board holds and peaks at while loading (measured with tracemalloc in
+separate, untimed runs):
+
+    python benchmarks/board_render.py
+    python benchmarks/board_render.py --lanes 8 --cards 500 --runs 9
+
+Prints a JSON report.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOARD_TEMPLATE = ("{% from 'partials/macros.html' import render_lane %}"
+                  "{% for lane in lanes %}{{ render_lane(lane) }}{% endfor %}")
+
+
+def _setup(args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+    from app.models import User, Board, Lane, Card, Category
+
+    app = create_app()
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x', is_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        board = Board(name='Big board', user_id=user.id)
+        db.session.add(board)
+        db.session.flush()
+        categories = [Category(name=f'Category {i}', color='#3B82F6') for i in range(args.categories)]
+        db.session.add_all(categories)
+        now = datetime.utcnow()
+        for i in range(args.lanes):
+            lane = Lane(title=f'Lane {i}', position=i + 1, board_id=board.id)
+            db.session.add(lane)
+            db.session.flush()
+            for j in range(args.cards):
+                card = Card(title=f'Card {i}.{j}', description='Lorem ipsum dolor sit amet. ' * 20,
+                            lane_id=lane.id, position=j + 1,
+                            due_date=now + timedelta(hours=rng.randint(-48, 240)) if j % 3 == 0 else None)
+                card.categories = rng.sample(categories, min(2, len(categories)))
+                db.session.add(card)
+        db.session.commit()
+        board_id = board.id
+
+    return app, path, board_id
+
+
+def _loaders(board_id):
+    from sqlalchemy.orm import defer, selectinload
+    from app.models import Lane, Card, Category
+    from app.projections import board_lanes, category_views
+
+    def orm():
+        lanes = Lane.query.filter_by(board_id=board_id).order_by(Lane.position).options(
+            selectinload(Lane.cards).options(defer(Card.description), selectinload(Card.categories))
+        ).all()
+        return lanes, Category.query.all()
+
+    def projection():
+        categories = category_views()
+        return board_lanes(board_id, categories), list(categories.values())
+
+    return {'orm': orm, 'projection': projection}
+
+
+def _measure(app, load, runs):
+    from app import db
+
+    template = app.jinja_env.from_string(BOARD_TEMPLATE)
+    load_times = []
+    render_times = []
+    html = ''
+    for _ in range(runs):
+        with app.test_request_context():
+            started = time.perf_counter()
+            lanes, _ = load()
+            loaded = time.perf_counter()
+            html = template.render(lanes=lanes)
+            load_times.append(loaded - started)
+            render_times.append(time.perf_counter() - loaded)
+            db.session.remove()
+
+    with app.test_request_context():
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        board = load()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del board
+        db.session.remove()
+
+    return html, {
+        'load_ms': round(statistics.median(load_times) * 1000, 2),
+        'render_ms': round(statistics.median(render_times) * 1000, 2),
+        'retained_kib': round((retained - before) / 1024, 1),
+        'peak_kib': round((peak - before) / 1024, 1),
+        'html_bytes': len(html),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lanes', type=int, default=5)
+    parser.add_argument('--cards', type=int, default=400, help='Cards per lane')
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app, db_path, board_id = _setup(args)
+    try:
+        pages = {}
+        results = {}
+        for name, load in _loaders(board_id).items():
+            pages[name], results[name] = _measure(app, load, args.runs)
+        report = {'lanes': args.lanes, 'cards': args.lanes * args.cards, 'runs': args.runs, **results}
+        if pages['orm'] != pages['projection']:
+            report['warning'] = 'The two paths rendered different HTML'
+        print(json.dumps(report, indent=2))
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
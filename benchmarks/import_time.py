@@ -0,0 +1,107 @@
+"""
+Cold-start import report
+
+Starts fresh interpreters that import the app and call create_app(), and
+reports the median wall time together with the slowest packages (from
+``python -X importtime``) and which of the deferred dependencies (email,
+registration and migration tooling) were loaded anyway.  Pass --compare
+with a git revision to measure that revision's tree the same way, side by
+side:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --compare HEAD~1 --runs 9
+
+Prints a JSON report.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WATCHED = ('flask_mail', 'email_validator', 'flask_migrate', 'alembic')
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+from app import create_app
+create_app('production')
+elapsed = time.perf_counter() - started
+print(elapsed, ' '.join(name for name in {watched!r} if name in sys.modules))
+"""
+
+
+def _env(db_path):
+    return dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PASSWORD_HASH_WORKERS='0')
+
+
+def _measure(tree, runs, top, db_path):
+    """Median create_app() time in a fresh interpreter and the costliest imports"""
+    probe = PROBE.format(watched=WATCHED)
+    times = []
+    loaded = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', probe], cwd=tree, env=_env(db_path),
+                             capture_output=True, text=True, check=True).stdout.split(maxsplit=1)
+        times.append(float(out[0]))
+        loaded = out[1].split() if len(out) > 1 else []
+
+    # Each -X importtime line: "import time: self | cumulative | indented module name"
+    trace = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=tree, env=_env(db_path),
+                           capture_output=True, text=True, check=True).stderr
+    packages = {}
+    for line in trace.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if '.' not in name and not name.startswith('_'):  # A package (or module) as a whole
+            packages[name] = max(packages.get(name, 0), int(cumulative))
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        'create_app_ms': {'median': round(statistics.median(times) * 1000, 1),
+                          'min': round(min(times) * 1000, 1)},
+        'slowest_imports_ms': {name: round(us / 1000, 1) for name, us in slowest[:top]},
+        'deferred_but_loaded': loaded,
+    }
+
+
+def _export(revision, target):
+    """Unpack ``revision`` of the repository into ``target``"""
+    with tempfile.TemporaryFile() as archive:
+        subprocess.run(['git', 'archive', '--format=tar', revision], cwd=ROOT, stdout=archive, check=True)
+        archive.seek(0)
+        with tarfile.open(fileobj=archive) as tar:
+            tar.extractall(target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per tree')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    parser.add_argument('--compare', metavar='REVISION', help='Also measure this git revision')
+    args = parser.parse_args()
+
+    # create_app() never connects, but give it a database URL that can't touch real data
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = os.path.join(scratch, 'kanban.db')
+        report = {'python': sys.version.split()[0], 'runs': args.runs,
+                  'current': _measure(ROOT, args.runs, args.top, db_path)}
+        if args.compare:
+            tree = os.path.join(scratch, 'tree')
+            os.mkdir(tree)
+            _export(args.compare, tree)
+            report[args.compare] = _measure(tree, args.runs, args.top, db_path)
+            before = report[args.compare]['create_app_ms']['median']
+            after = report['current']['create_app_ms']['median']
+            report['speedup'] = round(before / after, 2) if after else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""
+Drag-and-drop load test
+
+Seeds a throwaway database with one board per simulated user, serves the app
+under gunicorn with several worker processes, and runs scripted editing
+sessions against it from a pool of client processes.  Each session logs in
+through /auth/login, opens its board and then, with a short think time
+between actions, drags cards between lanes (PUT /cards/<id>/move), reorders
+a lane (PUT /cards/reorder), opens card modals (GET /cards/<id>) and the
+board stats.  Step up --users to find where SQLite lock errors or tail
+latency take over:
+
+    python benchmarks/loadtest.py --users 10 --workers 4
+    python benchmarks/loadtest.py --users 50 --workers 4 --output report.json
+
+Rate limiting is switched off in the server unless --rate-limits is given.
+Prints (or writes) a JSON report with throughput, p50/p99 latency per action
+and a breakdown of errors, including "database is locked" errors logged by
+the server.  Needs gunicorn, so it runs on Linux and macOS only.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LANES = ('To Do', 'In Progress', 'Review', 'Done')
+# Relative frequency of each action within a session
+ACTIONS = {'move': 5, 'reorder': 2, 'card_modal': 3, 'stats': 1, 'board': 1}
+
+
+def make_app():
+    """gunicorn entry point: the production app, optionally without rate limits"""
+    from app import create_app
+    app = create_app('production')
+    if os.environ.get('LOADTEST_RATE_LIMITS') != '1':
+        app.config['RATE_LIMITS'] = {}
+    return app
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """One simulated user with its own cookie jar, recording every request"""
+
+    def __init__(self, base, samples):
+        self.base = base
+        self.samples = samples
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+
+    def request(self, action, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base + path, data=data, headers=headers, method=method)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+            e.read()
+        except (urllib.error.URLError, OSError) as e:
+            status = None
+            error = type(getattr(e, 'reason', e)).__name__
+        self.samples.append((action, status, error, time.perf_counter() - start))
+        return status
+
+
+def _run_user(base, user, duration, think, seed):
+    """Log in, open the board and keep editing until the time is up"""
+    rng = random.Random(seed)
+    samples = []
+    session = Session(base, samples)
+    if session.request('login', 'POST', '/auth/login',
+                       form={'username': user['username'], 'password': 'password'}) != 302:
+        return samples
+    session.request('board', 'GET', '/')
+
+    # Local view of where the cards are, kept in step with our own moves
+    lanes = {lane_id: list(card_ids) for lane_id, card_ids in user['lanes'].items()}
+    lane_ids = list(lanes)
+    actions, weights = zip(*ACTIONS.items())
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        action = rng.choices(actions, weights)[0]
+        source = rng.choice([lane_id for lane_id in lane_ids if lanes[lane_id]])
+        if action == 'move':
+            card_id = lanes[source].pop(rng.randrange(len(lanes[source])))
+            target = rng.choice([lane_id for lane_id in lane_ids if lane_id != source])
+            position = rng.randint(0, len(lanes[target]))
+            lanes[target].insert(position, card_id)
+            session.request('move', 'PUT', f'/cards/{card_id}/move',
+                            json_body={'lane_id': target, 'position': position + 1})
+        elif action == 'reorder':
+            rng.shuffle(lanes[source])
+            session.request('reorder', 'PUT', '/cards/reorder', json_body={'updates': [
+                {'card_id': card_id, 'lane_id': source, 'position': index + 1}
+                for index, card_id in enumerate(lanes[source])]})
+        elif action == 'card_modal':
+            session.request('card_modal', 'GET', f'/cards/{rng.choice(lanes[source])}')
+        elif action == 'stats':
+            session.request('stats', 'GET', f"/boards/{user['board_id']}/stats")
+        else:
+            session.request('board', 'GET', '/')
+        time.sleep(rng.uniform(0, 2 * think))
+    return samples
+
+
+def _run_client(base, users, duration, think, seed):
+    """One client process: a thread per simulated user"""
+    results = [None] * len(users)
+
+    def run(index, user):
+        results[index] = _run_user(base, user, duration, think, seed + index)
+
+    threads = [threading.Thread(target=run, args=(index, user)) for index, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for samples in results if samples for sample in samples]
+
+
+def _seed(db_path, args):
+    """Create the users and their boards; returns the per-user layout"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    from app import create_app, db
+    from app.models import User, Board, Lane, Card
+    from app.passwords import canonical_method
+    from werkzeug.security import generate_password_hash
+
+    app = create_app('production')
+    users = []
+    with app.app_context():
+        db.create_all()
+        password_hash = generate_password_hash('password', canonical_method(app.config['PASSWORD_HASH_METHOD']))
+        for i in range(args.users):
+            user = User(username=f'user{i}', email=f'user{i}@example.com', password_hash=password_hash,
+                        is_verified=True)
+            db.session.add(user)
+            db.session.flush()
+            board = Board(name=f'Board {i}', user_id=user.id)
+            db.session.add(board)
+            db.session.flush()
+            lanes = [Lane(title=title, position=n + 1, board_id=board.id) for n, title in enumerate(LANES)]
+            db.session.add_all(lanes)
+            db.session.flush()
+            layout = {}
+            for lane in lanes:
+                cards = [Card(title=f'{lane.title} {n}', description='Load test card', lane_id=lane.id,
+                              position=n + 1) for n in range(args.cards // len(lanes))]
+                db.session.add_all(cards)
+                db.session.flush()
+                layout[lane.id] = [card.id for card in cards]
+            users.append({'username': user.username, 'board_id': board.id, 'lanes': layout})
+        db.session.commit()
+        db.engine.dispose()
+    return users
+
+
+def _start_server(args, db_path, log_path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PASSWORD_HASH_WORKERS='0',
+               LOADTEST_RATE_LIMITS='1' if args.rate_limits else '0', PYTHONPATH=ROOT)
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+               '--bind', f'127.0.0.1:{args.port}', '--chdir', ROOT, '--log-level', 'warning',
+               '--error-logfile', log_path, 'benchmarks.loadtest:make_app()']
+    server = subprocess.Popen(command, env=env)
+
+    base = f'http://127.0.0.1:{args.port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f'gunicorn exited with status {server.returncode}; see {log_path}')
+        try:
+            with urllib.request.urlopen(f'{base}/auth/login', timeout=1):
+                return server, base
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit('gunicorn did not start within 30 seconds')
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 2)
+
+
+def _latency(values):
+    return {'p50': _percentile(values, 50), 'p99': _percentile(values, 99),
+            'max': round(max(values) * 1000, 2) if values else None}
+
+
+def _report(args, samples, elapsed, log_path):
+    by_action = defaultdict(list)
+    errors = defaultdict(Counter)
+    for action, status, error, seconds in samples:
+        if error is None and status < 400:
+            by_action[action].append(seconds)
+        else:
+            errors[action][error or str(status)] += 1
+
+    with open(log_path, errors='replace') as f:
+        log = f.read()
+    succeeded = sum(len(values) for values in by_action.values())
+    return {
+        'users': args.users,
+        'workers': args.workers,
+        'threads': args.threads,
+        'client_processes': args.clients,
+        'duration_s': round(elapsed, 2),
+        'cpus': os.cpu_count(),
+        'requests': len(samples),
+        'succeeded': succeeded,
+        'failed': len(samples) - succeeded,
+        'requests_per_second': round(len(samples) / elapsed, 2),
+        'latency_ms': _latency([seconds for *_, seconds in samples]),
+        'actions': {action: dict(_latency(by_action[action]),
+                           requests=len(by_action[action]) + sum(errors[action].values()))
+                    for action in sorted(set(by_action) | set(errors))},
+        'errors': {action: dict(counts) for action, counts in sorted(errors.items()) if counts},
+        'server': {
+            'database_locked': log.count('database is locked'),
+            'tracebacks': log.count('Traceback (most recent call last)'),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='Concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds each session keeps editing')
+    parser.add_argument('--think', type=float, default=0.2, help='Mean seconds between a user\'s actions')
+    parser.add_argument('--cards', type=int, default=40, help='Cards per board')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+    parser.add_argument('--clients', type=int, default=2, help='Load-generating client processes')
+    parser.add_argument('--port', type=int, default=5078)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rate-limits', action='store_true', help='Keep the configured RATE_LIMITS')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    fd, log_path = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    server = None
+    try:
+        users = _seed(db_path, args)
+        server, base = _start_server(args, db_path, log_path)
+
+        shares = [users[i::args.clients] for i in range(args.clients)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(args.clients) as executor:
+            futures = [executor.submit(_run_client, base, share, args.duration, args.think, args.seed + 1000 * i)
+                       for i, share in enumerate(shares) if share]
+            samples = [sample for future in futures for sample in future.result()]
+        elapsed = time.perf_counter() - start
+
+        report = json.dumps(_report(args, samples, elapsed, log_path), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            print(report)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(30)
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm', log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
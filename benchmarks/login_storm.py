@@ -0,0 +1,167 @@
+"""
+Login storm benchmark
+
+Serves the app from a threaded server on a throwaway database, fires
+concurrent logins at it and, at the same time, measures the latency of a
+cheap authenticated endpoint (GET /boards/<id>) that stands in for
+drag-and-drop traffic.  Run it once with hashing inline and once with the
+process pool to see the difference:
+
+    python benchmarks/login_storm.py --hash-workers 0
+    python benchmarks/login_storm.py --hash-workers 2
+
+Prints a JSON report with login throughput and hot-endpoint percentiles.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _session():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+
+
+def _request(opener, url, data=None):
+    """Return (status, seconds) for one request"""
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    start = time.perf_counter()
+    try:
+        with opener.open(url, body, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 2)
+
+
+def _setup(args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+    from app.models import User, Board, Lane, Card
+    from app.passwords import canonical_method
+    from werkzeug.security import generate_password_hash
+
+    app = create_app()
+    app.config['PASSWORD_HASH_WORKERS'] = args.hash_workers
+    app.config['PASSWORD_HASH_MAX_PENDING'] = max(args.concurrency, 1)
+
+    with app.app_context():
+        db.create_all()
+        # Hash once and share it; the storm measures verification, not setup
+        password_hash = generate_password_hash('password', canonical_method(app.config['PASSWORD_HASH_METHOD']))
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash=password_hash,
+                      is_verified=True) for i in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+
+        board = Board(name='Hot board', user_id=users[0].id)
+        db.session.add(board)
+        db.session.flush()
+        lane = Lane(title='To Do', position=1.0, board_id=board.id)
+        db.session.add(lane)
+        db.session.flush()
+        db.session.add_all([Card(title=f'Card {i}', lane_id=lane.id, position=i + 1) for i in range(20)])
+        db.session.commit()
+        board_id = board.id
+
+    return app, path, board_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hash-workers', type=int, default=2, help='PASSWORD_HASH_WORKERS (0 = inline)')
+    parser.add_argument('--logins', type=int, default=100, help='Total login attempts')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent login clients')
+    parser.add_argument('--users', type=int, default=50, help='Accounts to log in as')
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    app, db_path, board_id = _setup(args)
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{args.port}'
+
+    try:
+        hot = _session()
+        status, _ = _request(hot, f'{base}/auth/login', {'username': 'user0', 'password': 'password'})
+        assert status == 302, f'login failed with {status}'
+
+        # Baseline latency of the hot endpoint with an idle server
+        baseline = [_request(hot, f'{base}/boards/{board_id}')[1] for _ in range(50)]
+
+        storm_over = threading.Event()
+        during = []
+
+        def probe():
+            while not storm_over.is_set():
+                during.append(_request(hot, f'{base}/boards/{board_id}')[1])
+                time.sleep(0.01)
+
+        def login(i):
+            return _request(_session(), f'{base}/auth/login',
+                            {'username': f'user{i % args.users}', 'password': 'password'})
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            results = list(executor.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - start
+        storm_over.set()
+        prober.join()
+
+        login_times = [seconds for status, seconds in results if status == 302]
+        report = {
+            'hash_workers': args.hash_workers,
+            'hash_method': app.config['PASSWORD_HASH_METHOD'],
+            'cpus': os.cpu_count(),
+            'logins': args.logins,
+            'concurrency': args.concurrency,
+            'succeeded': len(login_times),
+            'busy_503': sum(1 for status, _ in results if status == 503),
+            'logins_per_second': round(len(login_times) / elapsed, 2),
+            'login_ms': {'p50': _percentile(login_times, 50), 'p99': _percentile(login_times, 99)},
+            'hot_endpoint_ms': {
+                'idle': {'p50': _percentile(baseline, 50), 'p99': _percentile(baseline, 99)},
+                'during_storm': {'p50': _percentile(during, 50), 'p99': _percentile(during, 99),
+                                 'requests': len(during)},
+            },
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        server.shutdown()
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Template render micro-benchmark
+
+Renders the board page, and cards one at a time as the card routes return
+them, from in-memory views (no database), and reports the median time per
+1,000 cards for each.  It also times loading every template into a fresh
+Jinja environment, as a new worker does, both from source and from a warm
+bytecode cache:
+
+    python benchmarks/template_render.py
+    python benchmarks/template_render.py --lanes 8 --cards 500 --runs 9
+
+Prints a JSON report.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _board(args):
+    """Lanes of cards built from the projection views the board page renders"""
+    from app.projections import CardView, CategoryView, LaneView
+
+    categories = [CategoryView(i, f'Category {i}', '#3B82F6') for i in range(args.categories)]
+    now = datetime.utcnow()
+    lanes = []
+    for i in range(args.lanes):
+        lane = LaneView(i + 1, f'Lane {i}', i + 1, None, 1)
+        for j in range(args.cards):
+            card_id = i * args.cards + j + 1
+            due_date = now + timedelta(days=j % 10) if j % 3 == 0 else None
+            card = CardView(card_id, f'Card {i}.{j}', lane.id, j + 1, due_date,
+                            'soon' if due_date and j % 10 < 2 else None, 1)
+            card.categories = categories[j % len(categories):][:2] if categories else []
+            lane.cards.append(card)
+        lanes.append(lane)
+    return lanes, categories
+
+
+def _median_ms(render, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def _load_all(app, bytecode_cache):
+    """Seconds to load every template into a new environment, as a fresh worker would"""
+    from flask.templating import Environment
+
+    env = Environment(app, **{**app.jinja_options, 'bytecode_cache': bytecode_cache})
+    names = env.list_templates(extensions=['html'])
+    started = time.perf_counter()
+    for name in names:
+        env.get_template(name)
+    return time.perf_counter() - started, len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lanes', type=int, default=5)
+    parser.add_argument('--cards', type=int, default=400, help='Cards per lane')
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite://'  # Nothing is queried
+    from flask import render_template
+    from flask_login import login_user
+    from jinja2 import FileSystemBytecodeCache
+    from app import create_app
+    from app.models import User
+    from app.routes import render_card
+
+    app = create_app()
+    lanes, categories = _board(args)
+    cards = [card for lane in lanes for card in lane.cards]
+    per_thousand = 1000 / len(cards)
+
+    with app.test_request_context():
+        login_user(User(id=1, username='bench', email='bench@example.com'))
+        board_ms = _median_ms(lambda: render_template('index.html', lanes=lanes, categories=categories,
+                                                      templates=[], current_board=None), args.runs)
+        card_ms = _median_ms(lambda: [render_card(card) for card in cards], args.runs)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        from_source, templates = _load_all(app, None)
+        _load_all(app, FileSystemBytecodeCache(cache_dir))  # Fill the cache
+        from_cache = statistics.median(_load_all(app, FileSystemBytecodeCache(cache_dir))[0]
+                                       for _ in range(args.runs))
+
+    report = {
+        'cards': len(cards),
+        'runs': args.runs,
+        'board_page_ms_per_1000_cards': round(board_ms * per_thousand, 2),
+        'single_card_ms_per_1000_cards': round(card_ms * per_thousand, 2),
+        'template_load_ms': {
+            'templates': templates,
+            'from_source': round(from_source * 1000, 2),
+            'from_bytecode_cache': round(from_cache * 1000, 2),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+WIP limit stress test
+
+Seeds a throwaway database with one board whose lanes have small WIP
+limits, serves the app under gunicorn with several worker processes, and
+has a pool of client processes hammer that one board with everything that
+puts cards into a lane: single and pasted card creation (POST /cards),
+drags (PUT /cards/<id>/move), bulk moves, and archive/restore round trips,
+plus deletes so the lanes keep draining and refilling.  Meanwhile a separate
+connection polls the database and records every committed state in which a
+lane holds more cards than its limit:
+
+    python benchmarks/wip_stress.py
+    python benchmarks/wip_stress.py --workers 4 --clients 4 --threads 8 --duration 60
+
+Prints a JSON report with request counts by action and status and the
+violations seen, and exits with status 1 if there were any.  Needs gunicorn,
+so it runs on Linux and macOS only.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.loadtest import Session, _start_server  # noqa: E402
+
+# Relative frequency of each action
+ACTIONS = {'create': 3, 'paste': 1, 'move': 5, 'bulk_move': 1, 'delete': 1, 'archive': 1, 'restore': 1}
+CARD_ID = re.compile(r'data-card-id="(\d+)"')
+
+OVER_LIMIT = """
+SELECT lanes.id, lanes.wip_limit, COUNT(cards.id)
+FROM lanes JOIN cards ON cards.lane_id = lanes.id
+WHERE lanes.board_id = ? AND lanes.wip_limit IS NOT NULL
+GROUP BY lanes.id, lanes.wip_limit
+HAVING COUNT(cards.id) > lanes.wip_limit
+"""
+
+
+def _seed(db_path, args):
+    """One user and one board with limited lanes, each filled to half its limit"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    from app import create_app, db
+    from app.models import User, Board, Lane, Card
+    from app.passwords import canonical_method
+    from werkzeug.security import generate_password_hash
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        password_hash = generate_password_hash('password', canonical_method(app.config['PASSWORD_HASH_METHOD']))
+        user = User(username='stress', email='stress@example.com', password_hash=password_hash, is_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        board = Board(name='Stress board', user_id=user.id)
+        db.session.add(board)
+        db.session.flush()
+        lanes = [Lane(title=f'Lane {n}', position=n + 1, wip_limit=args.limit, board_id=board.id)
+                 for n in range(args.lanes)]
+        db.session.add_all(lanes)
+        db.session.flush()
+        cards = [Card(title=f'{lane.title} card {n}', lane_id=lane.id, position=n + 1)
+                 for lane in lanes for n in range(args.limit // 2)]
+        db.session.add_all(cards)
+        db.session.commit()
+        layout = {'board_id': board.id, 'lane_ids': [lane.id for lane in lanes],
+                  'card_ids': [card.id for card in cards]}
+        db.engine.dispose()
+    return layout
+
+
+def _run_thread(base, layout, deadline, seed):
+    """Log in and fire random lane-filling actions until the deadline"""
+    rng = random.Random(seed)
+    samples = []
+    session = Session(base, samples)
+    if session.request('login', 'POST', '/auth/login', form={'username': 'stress', 'password': 'password'}) != 302:
+        return samples
+
+    # Ids this thread knows about; other threads may have moved or deleted them
+    card_ids = list(layout['card_ids'])
+    lane_ids = layout['lane_ids']
+    actions, weights = zip(*ACTIONS.items())
+    while time.monotonic() < deadline:
+        action = rng.choices(actions, weights)[0]
+        lane_id = rng.choice(lane_ids)
+        if action in ('create', 'paste'):
+            count = 1 if action == 'create' else rng.randint(2, 4)
+            status, body = _request(session, action, 'POST', '/cards', form=[('lane_id', lane_id)] + [
+                ('title', f'stress {rng.random():.6f}') for _ in range(count)])
+            card_ids.extend(int(card_id) for card_id in CARD_ID.findall(body))
+        elif not card_ids:
+            continue
+        elif action == 'move':
+            session.request('move', 'PUT', f'/cards/{rng.choice(card_ids)}/move',
+                            json_body={'lane_id': lane_id, 'position': rng.randint(1, 10)})
+        elif action == 'bulk_move':
+            session.request('bulk_move', 'POST', '/cards/bulk', json_body={
+                'operation': 'move', 'lane_id': lane_id,
+                'card_ids': rng.sample(card_ids, min(len(card_ids), rng.randint(2, 4)))})
+        elif action == 'delete':
+            card_id = card_ids.pop(rng.randrange(len(card_ids)))
+            session.request('delete', 'DELETE', f'/cards/{card_id}')
+        elif action == 'archive':
+            card_id = card_ids.pop(rng.randrange(len(card_ids)))
+            session.request('archive', 'POST', '/cards/bulk',
+                            json_body={'operation': 'archive', 'card_ids': [card_id]})
+        else:
+            status, body = _request(session, 'archive_list', 'GET', f"/boards/{layout['board_id']}/archive")
+            archived = json.loads(body)['cards'] if status == 200 else []
+            if archived:
+                status, body = _request(session, 'restore', 'POST',
+                                        f"/archive/{rng.choice(archived)['id']}/restore",
+                                        form={'lane_id': lane_id})
+                if status == 200:
+                    card_ids.append(json.loads(body)['id'])
+    return samples
+
+
+def _request(session, action, method, path, form=None):
+    """Like Session.request, but also returns the response body"""
+    data = urllib.parse.urlencode(form).encode() if form is not None else None
+    req = urllib.request.Request(session.base + path, data=data, method=method)
+    start = time.perf_counter()
+    body = ''
+    error = None
+    try:
+        with session.opener.open(req, timeout=60) as response:
+            body = response.read().decode()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+        e.read()
+    except (urllib.error.URLError, OSError) as e:
+        status = None
+        error = type(getattr(e, 'reason', e)).__name__
+    session.samples.append((action, status, error, time.perf_counter() - start))
+    return status, body
+
+
+def _run_client(base, layout, duration, threads, seed):
+    """One client process: several threads sharing the board"""
+    deadline = time.monotonic() + duration
+    results = [None] * threads
+
+    def run(index):
+        results[index] = _run_thread(base, layout, deadline, seed + index)
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [sample for samples in results if samples for sample in samples]
+
+
+def _over_limit(connection, board_id):
+    return [{'lane_id': lane_id, 'wip_limit': wip_limit, 'cards': count}
+            for lane_id, wip_limit, count in connection.execute(OVER_LIMIT, (board_id,))]
+
+
+def _watch(db_path, board_id, stop, violations, checks):
+    """Poll committed lane counts until ``stop`` is set, then look once more"""
+    connection = sqlite3.connect(db_path, timeout=30)
+    try:
+        while not stop.is_set():
+            violations.extend(_over_limit(connection, board_id))
+            checks[0] += 1
+            time.sleep(0.005)
+        violations.extend(_over_limit(connection, board_id))
+        checks[0] += 1
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load')
+    parser.add_argument('--lanes', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=6, help='WIP limit of every lane')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--clients', type=int, default=2, help='Load-generating client processes')
+    parser.add_argument('--threads', type=int, default=4, help='Request threads per client process')
+    parser.add_argument('--port', type=int, default=5079)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    fd, log_path = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    server = None
+    try:
+        layout = _seed(db_path, args)
+        server, base = _start_server(SimpleNamespace(workers=args.workers, threads=1, port=args.port,
+                                                     rate_limits=False), db_path, log_path)
+
+        stop = threading.Event()
+        violations = []
+        checks = [0]
+        watcher = threading.Thread(target=_watch, args=(db_path, layout['board_id'], stop, violations, checks))
+        watcher.start()
+        with ProcessPoolExecutor(args.clients) as executor:
+            futures = [executor.submit(_run_client, base, layout, args.duration, args.threads, args.seed + 1000 * i)
+                       for i in range(args.clients)]
+            samples = [sample for future in futures for sample in future.result()]
+        stop.set()
+        watcher.join()
+
+        statuses = defaultdict(Counter)
+        for action, status, error, _ in samples:
+            statuses[action][error or str(status)] += 1
+        with open(log_path, errors='replace') as f:
+            log = f.read()
+        report = {
+            'workers': args.workers,
+            'client_threads': args.clients * args.threads,
+            'lanes': args.lanes,
+            'wip_limit': args.limit,
+            'requests': len(samples),
+            'statuses': {action: dict(counts) for action, counts in sorted(statuses.items())},
+            'checks': checks[0],
+            'violations': violations[:20],
+            'violation_count': len(violations),
+            'server_tracebacks': log.count('Traceback (most recent call last)'),
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(30)
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm', log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
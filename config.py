@@ -7,6 +7,7 @@ class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_WAL = True  # Write-ahead logging: readers and backups don't block writers
 
     # Email configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -16,6 +17,101 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@kanban.local')
 
+    # Password hashing (app/passwords.py); hashes are upgraded on login when the method changes
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))  # Per web worker
+    PASSWORD_HASH_QUEUE_TIMEOUT = 5  # Seconds to wait for a free slot before answering 503
+
+    # Rate limiting (app/ratelimit.py): endpoint or blueprint -> {'ip'|'user': (capacity, period_seconds)}
+    RATE_LIMITS = {
+        'auth.login': {'ip': (10, 60)},
+        'auth.register': {'ip': (5, 3600)},
+        'auth.resend_verification': {'ip': (3, 3600)},
+        'main.move_card': {'user': (120, 60)},
+        'main.move_card_put': {'user': (120, 60)},
+        'main.reorder_cards': {'user': (120, 60)},
+        'main.reorder_lanes': {'user': (60, 60)},
+        'main': {'user': (300, 60)},  # Every other mutation on the main blueprint
+    }
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE')  # SQLite path to share buckets across workers
+    RATE_LIMIT_MAX_KEYS = 100000  # In-memory buckets kept per worker
+
+    # Users allowed to profile requests and open /admin pages
+    ADMIN_USERNAMES = [name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()]
+
+    # Request profiling (X-Profile header or ?_profile=, admins only)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or str(basedir / 'profiles')
+    PROFILE_RETAIN = 50  # Newest profiles kept
+    PROFILE_SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+
+    # Prometheus metrics at /metrics (app/metrics.py)
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Bearer token; required except when debugging or testing
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # Shared directory to aggregate across worker processes
+    METRICS_FLUSH_INTERVAL = 5  # Max seconds between a worker's snapshot writes
+
+    # Card archival (cold storage)
+    ARCHIVE_LANE_TITLES = [title.strip() for title in
+                           os.environ.get('ARCHIVE_LANE_TITLES', 'Done').split(',') if title.strip()]
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+    ARCHIVE_CHUNK_SIZE = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 500))
+    ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 6 * 3600))  # Seconds between scheduled runs
+    ARCHIVE_PAGE_SIZE = 50
+
+    # Card attachments (content-addressed blobs on the local filesystem)
+    ATTACHMENT_DIR = os.environ.get('ATTACHMENT_DIR') or str(basedir / 'attachments')
+    ATTACHMENT_MAX_SIZE = int(os.environ.get('ATTACHMENT_MAX_SIZE', 25 * 1024 * 1024))  # Bytes per file
+    ATTACHMENT_CHUNK_SIZE = 64 * 1024  # Bytes read from the request per write
+
+    # Bulk card operations (multi-select, pasted card lists)
+    BULK_MAX_CARDS = 500  # Cards per bulk request
+
+    BOARD_PAGE_SIZE = 25  # Boards per page in the switcher and board manager
+    DASHBOARD_PAGE_SIZE = 50  # Cards per page on the cross-board dashboard
+
+    # Cleanup of unverified accounts (tokens expire after app.email.TOKEN_EXPIRATION)
+    UNVERIFIED_ACCOUNT_DAYS = int(os.environ.get('UNVERIFIED_ACCOUNT_DAYS', 7))  # Grace period after expiry
+    CLEANUP_CHUNK_SIZE = 500
+    CLEANUP_INTERVAL = int(os.environ.get('CLEANUP_INTERVAL', 3600))  # Seconds between scheduled runs
+
+    # Online SQLite backups (flask --app run backup / restore)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or str(basedir / 'backups')
+    BACKUP_RETAIN = int(os.environ.get('BACKUP_RETAIN', 7))  # Archives kept after rotation
+    BACKUP_PAGES_PER_STEP = 256  # Pages copied per step of the online backup
+    BACKUP_STEP_SLEEP = 0.005  # Seconds to pause between steps so writers get the lock
+    BACKUP_MAX_RESTARTS = 50  # Give up when concurrent writes keep restarting a non-WAL copy
+    BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', 0))  # Seconds between scheduled backups, 0 = off
+
+    # Data migrations (flask --app run data-migrate)
+    DATA_MIGRATION_CHUNK_SIZE = 1000
+    DATA_MIGRATION_DUTY_CYCLE = float(os.environ.get('DATA_MIGRATION_DUTY_CYCLE', 0.5))  # Share of time spent working
+    DATA_MIGRATION_MAX_RETRIES = 8  # Consecutive "database is locked" retries per chunk
+
+    # Due dates and reminders
+    DUE_SOON_HOURS = int(os.environ.get('DUE_SOON_HOURS', 48))
+    REMINDER_LEAD_HOURS = int(os.environ.get('REMINDER_LEAD_HOURS', 24))  # Remind this long before the due date
+    REMINDER_REFRESH = int(os.environ.get('REMINDER_REFRESH', 900))  # Max seconds before re-reading due dates
+
+    # Compiled Jinja templates, shared by worker processes and kept across restarts
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR') or str(basedir / 'template_cache')
+
+    # Static asset build (flask --app run build-assets)
+    ASSET_FILES = ['css/custom.css', 'js/kanban.js']
+    VENDOR_ASSETS = {
+        'vendor/htmx.min.js': 'https://unpkg.com/htmx.org@1.9.10/dist/htmx.min.js',
+        'vendor/Sortable.min.js': 'https://cdn.jsdelivr.net/npm/sortablejs@1.15.1/Sortable.min.js',
+    }
+    ASSET_COMPRESS_LEVEL = 9
+
+    # Dynamic response compression
+    COMPRESS_ALGORITHMS = ['br', 'gzip']  # Server preference when the client accepts both equally
+    COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/plain', 'text/javascript',
+                          'application/javascript', 'application/json']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # Bytes; smaller bodies aren't worth it
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))  # brotli quality, 0-11
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
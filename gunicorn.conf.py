@@ -0,0 +1,39 @@
+"""gunicorn settings for wsgi:app; every value can be overridden on the command line"""
+import gc
+import multiprocessing
+import os
+from pathlib import Path
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = 30
+# Recycle workers now and then to bound slow leaks; jitter avoids restarting them all at once
+max_requests = 2000
+max_requests_jitter = 200
+
+# Load and warm the app once in the master; workers are forked from it (see wsgi.py)
+preload_app = True
+
+# Keep the collector from touching (and so un-sharing) the preloaded objects
+# until wsgi.py has frozen them; workers turn it back on right after the fork
+gc.disable()
+
+
+def on_starting(server):
+    # Snapshots from a previous run would be summed into this one's metrics (app/metrics.py)
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir and Path(metrics_dir).is_dir():
+        for snapshot in Path(metrics_dir).glob('*.json'):
+            snapshot.unlink()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def worker_exit(server, worker):
+    # Publish the requests served since the last periodic snapshot (app/metrics.py)
+    from app.metrics import flush
+    flush(worker.wsgi)
@@ -0,0 +1,32 @@
+"""Add card due dates
+
+Revision ID: 0d3f6b8a2e95
+Revises: 5b8e2c9f4d71
+Create Date: 2026-10-19 15:02:44.903177
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d3f6b8a2e95'
+down_revision = '5b8e2c9f4d71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('due_date', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('reminder_sent_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_cards_lane_id_due_date', ['lane_id', 'due_date'], unique=False)
+        batch_op.create_index('ix_cards_reminder_sent_at_due_date', ['reminder_sent_at', 'due_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.drop_index('ix_cards_reminder_sent_at_due_date')
+        batch_op.drop_index('ix_cards_lane_id_due_date')
+        batch_op.drop_column('reminder_sent_at')
+        batch_op.drop_column('due_date')
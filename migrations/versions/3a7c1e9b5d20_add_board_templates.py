@@ -0,0 +1,27 @@
+"""Add board templates
+
+Revision ID: 3a7c1e9b5d20
+Revises: fd21c9f10b3d
+Create Date: 2026-10-19 09:12:40.118236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c1e9b5d20'
+down_revision = 'fd21c9f10b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_template', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.drop_column('is_template')
@@ -0,0 +1,26 @@
+"""Add lane WIP limit
+
+Revision ID: 5b8e2c9f4d71
+Revises: e94b7d03a612
+Create Date: 2026-10-19 14:21:08.415562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2c9f4d71'
+down_revision = 'e94b7d03a612'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lanes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('wip_limit', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('lanes', schema=None) as batch_op:
+        batch_op.drop_column('wip_limit')
@@ -0,0 +1,37 @@
+"""Add board last_used_at and board list indexes
+
+Revision ID: 7f1a3d5c9b26
+Revises: 0d3f6b8a2e95
+Create Date: 2026-10-19 16:20:31.504218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f1a3d5c9b26'
+down_revision = '0d3f6b8a2e95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_used_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE boards SET last_used_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)")
+
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.alter_column('last_used_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_boards_user_template_name_id',
+                              ['user_id', 'is_template', 'name', 'id'], unique=False)
+        batch_op.create_index('ix_boards_user_template_last_used_id',
+                              ['user_id', 'is_template', 'last_used_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.drop_index('ix_boards_user_template_last_used_id')
+        batch_op.drop_index('ix_boards_user_template_name_id')
+        batch_op.drop_column('last_used_at')
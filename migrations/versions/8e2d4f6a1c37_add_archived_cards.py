@@ -0,0 +1,50 @@
+"""Add archived cards
+
+Revision ID: 8e2d4f6a1c37
+Revises: 3a7c1e9b5d20
+Create Date: 2026-10-19 10:03:11.502847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2d4f6a1c37'
+down_revision = '3a7c1e9b5d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_cards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=False),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('lane_id', sa.Integer(), nullable=False),
+    sa.Column('lane_title', sa.String(length=100), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('position', sa.Float(), nullable=False),
+    sa.Column('category_ids', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_cards', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_cards_board_id_id', ['board_id', 'id'], unique=False)
+
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.create_index('ix_cards_lane_id_updated_at', ['lane_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.drop_index('ix_cards_lane_id_updated_at')
+
+    with op.batch_alter_table('archived_cards', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_cards_board_id_id')
+
+    op.drop_table('archived_cards')
@@ -0,0 +1,32 @@
+"""Add user verification_sent_at
+
+Revision ID: a2c4e6f8b013
+Revises: 7f1a3d5c9b26
+Create Date: 2026-10-19 17:05:12.660381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c4e6f8b013'
+down_revision = '7f1a3d5c9b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('verification_sent_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_users_is_verified_verification_sent_at',
+                              ['is_verified', 'verification_sent_at'], unique=False)
+
+    # Existing tokens were issued at registration at the latest
+    op.execute("UPDATE users SET verification_sent_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_is_verified_verification_sent_at')
+        batch_op.drop_column('verification_sent_at')
@@ -0,0 +1,36 @@
+"""Never reuse card ids
+
+Revision ID: a4c6e8f0b293
+Revises: f3b5d7e9a182
+Create Date: 2026-10-20 10:27:05.664190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c6e8f0b293'
+down_revision = 'f3b5d7e9a182'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cards', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+    # Start above every id already used, including cards since deleted or
+    # archived whose transitions are still recorded
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'cards'")
+    op.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'cards', MAX("
+               "(SELECT COALESCE(MAX(id), 0) FROM cards), "
+               "(SELECT COALESCE(MAX(card_id), 0) FROM card_transitions), "
+               "(SELECT COALESCE(MAX(card_id), 0) FROM archived_cards))")
+
+
+def downgrade():
+    with op.batch_alter_table('cards', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,33 @@
+"""Add data migration checkpoints
+
+Revision ID: b7d9f1a3c524
+Revises: a2c4e6f8b013
+Create Date: 2026-10-19 17:48:55.217094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d9f1a3c524'
+down_revision = 'a2c4e6f8b013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_migrations',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_key', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('chunks_done', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('data_migrations')
@@ -0,0 +1,28 @@
+"""Add row version counters to boards, lanes and cards
+
+Revision ID: c3e5a7b9d146
+Revises: b7d9f1a3c524
+Create Date: 2026-10-19 19:12:44.208135
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d146'
+down_revision = 'b7d9f1a3c524'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('boards', 'lanes', 'cards'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in ('cards', 'lanes', 'boards'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
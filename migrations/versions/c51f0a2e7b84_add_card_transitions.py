@@ -0,0 +1,52 @@
+"""Add card transitions and lane daily flow
+
+Revision ID: c51f0a2e7b84
+Revises: 8e2d4f6a1c37
+Create Date: 2026-10-19 11:47:52.330914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51f0a2e7b84'
+down_revision = '8e2d4f6a1c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('card_transitions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=False),
+    sa.Column('from_lane_id', sa.Integer(), nullable=True),
+    sa.Column('to_lane_id', sa.Integer(), nullable=True),
+    sa.Column('age_seconds', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('card_transitions', schema=None) as batch_op:
+        batch_op.create_index('ix_card_transitions_board_to_lane_created',
+                              ['board_id', 'to_lane_id', 'created_at'], unique=False)
+
+    op.create_table('lane_daily_flow',
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('lane_id', sa.Integer(), nullable=False),
+    sa.Column('arrivals', sa.Integer(), nullable=False),
+    sa.Column('departures', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['board_id'], ['boards.id'], ),
+    sa.PrimaryKeyConstraint('board_id', 'day', 'lane_id')
+    )
+
+
+def downgrade():
+    op.drop_table('lane_daily_flow')
+
+    with op.batch_alter_table('card_transitions', schema=None) as batch_op:
+        batch_op.drop_index('ix_card_transitions_board_to_lane_created')
+
+    op.drop_table('card_transitions')
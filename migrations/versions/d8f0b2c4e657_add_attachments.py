@@ -0,0 +1,45 @@
+"""Add card attachments
+
+Revision ID: d8f0b2c4e657
+Revises: c3e5a7b9d146
+Create Date: 2026-10-19 20:36:05.517290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f0b2c4e657'
+down_revision = 'c3e5a7b9d146'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attachments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=True),
+    sa.Column('archived_card_id', sa.Integer(), nullable=True),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['archived_card_id'], ['archived_cards.id'], ),
+    sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_attachments_archived_card_id'), ['archived_card_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_attachments_card_id'), ['card_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_attachments_sha256'), ['sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attachments_sha256'))
+        batch_op.drop_index(batch_op.f('ix_attachments_card_id'))
+        batch_op.drop_index(batch_op.f('ix_attachments_archived_card_id'))
+
+    op.drop_table('attachments')
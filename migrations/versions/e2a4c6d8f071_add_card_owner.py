@@ -0,0 +1,36 @@
+"""Copy the board owner onto cards for the dashboard index
+
+Revision ID: e2a4c6d8f071
+Revises: d8f0b2c4e657
+Create Date: 2026-10-19 22:14:37.802113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a4c6d8f071'
+down_revision = 'd8f0b2c4e657'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+
+    op.execute("UPDATE cards SET user_id = (SELECT boards.user_id FROM lanes JOIN boards ON boards.id = lanes.board_id "
+               "WHERE lanes.id = cards.lane_id)")
+
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_cards_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.create_index('ix_cards_user_id_updated_at_id', ['user_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.drop_index('ix_cards_user_id_updated_at_id')
+        batch_op.drop_constraint('fk_cards_user_id_users', type_='foreignkey')
+        batch_op.drop_column('user_id')
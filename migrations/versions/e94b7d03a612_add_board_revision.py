@@ -0,0 +1,32 @@
+"""Add board revision and lane board index
+
+Revision ID: e94b7d03a612
+Revises: c51f0a2e7b84
+Create Date: 2026-10-19 13:05:27.764120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e94b7d03a612'
+down_revision = 'c51f0a2e7b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('lanes', schema=None) as batch_op:
+        batch_op.create_index('ix_lanes_board_id_position', ['board_id', 'position'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lanes', schema=None) as batch_op:
+        batch_op.drop_index('ix_lanes_board_id_position')
+
+    with op.batch_alter_table('boards', schema=None) as batch_op:
+        batch_op.drop_column('revision')
@@ -0,0 +1,26 @@
+"""Keep due dates on archived cards
+
+Revision ID: f3b5d7e9a182
+Revises: e2a4c6d8f071
+Create Date: 2026-10-20 09:41:52.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b5d7e9a182'
+down_revision = 'e2a4c6d8f071'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('archived_cards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('due_date', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('archived_cards', schema=None) as batch_op:
+        batch_op.drop_column('due_date')
@@ -1,7 +1,20 @@
+import os
+import click
+from flask_migrate import Migrate
 from app import create_app, db
 from app.models import Board, Lane, Card, Category
+from app.archive import archive_old_cards
+from app.cleanup import cleanup_unverified_users
+from app.attachments import sweep_blobs
+from app.backup import BackupError, create_backup, list_backups, restore_backup, verify_backup
+from app.jobs import Scheduler
+from app.reminders import schedule_reminders
+from app.data_migrations import get_state, load_migrations, reset_state, run_migration
+from app.assets import AssetBuildError, build_assets as build_static_assets, fetch_vendor_assets
 
 app = create_app()
+# Alembic is only needed for `flask db ...`, so the web entry point (wsgi.py) never imports it
+migrate = Migrate(app, db)
 
 @app.cli.command()
 def init_db():
@@ -127,5 +140,128 @@ def seed_db():
     print(f"Created {len(lanes)} lanes")
     print(f"Created {len(cards)} cards")
 
+@app.cli.command()
+@click.option('--days', type=int, help='Archive cards untouched for this many days (default: ARCHIVE_AFTER_DAYS)')
+def archive_cards(days):
+    """Move old cards out of archive lanes into cold storage"""
+    count = archive_old_cards(max_age_days=days)
+    print(f"Archived {count} cards")
+
+@app.cli.command()
+def cleanup_accounts():
+    """Clear expired verification tokens and delete stale unverified accounts"""
+    result = cleanup_unverified_users()
+    print(f"Cleared {result['tokens_cleared']} expired tokens, deleted {result['users_deleted']} accounts")
+
+@app.cli.command()
+def gc_attachments():
+    """Delete attachment blobs nothing refers to and abandoned uploads"""
+    result = sweep_blobs()
+    print(f"Removed {result['blobs_removed']} unused blobs, {result['temp_files_removed']} abandoned uploads")
+
+@app.cli.command()
+@click.option('--dir', 'backup_dir', help='Directory for the archive (default: BACKUP_DIR)')
+def backup(backup_dir):
+    """Back up the live database without blocking writers"""
+    try:
+        archive = create_backup(backup_dir)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    print(f"Backup written to {archive}")
+
+@app.cli.command()
+@click.argument('archive', required=False)
+@click.option('--verify-only', is_flag=True, help='Check the archive without restoring it')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+def restore(archive, verify_only, yes):
+    """Restore the database from a backup (default: the newest)"""
+    if archive is None:
+        backups = list_backups()
+        if not backups:
+            raise click.ClickException('No backups found')
+        archive = backups[0]
+
+    try:
+        if verify_only:
+            os.remove(verify_backup(archive))
+            print(f"{archive} is valid")
+            return
+        if not yes:
+            click.confirm(f"Replace the current database with {archive}?", abort=True)
+        restore_backup(archive)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    print(f"Database restored from {archive}")
+
+@app.cli.command()
+def run_jobs():
+    """Run scheduled background jobs until interrupted"""
+    scheduler = Scheduler(app)
+    scheduler.every(app.config['ARCHIVE_INTERVAL'], archive_old_cards, run_now=True)
+    scheduler.every(app.config['CLEANUP_INTERVAL'], cleanup_unverified_users, run_now=True)
+    scheduler.every(app.config['CLEANUP_INTERVAL'], sweep_blobs)
+    if app.config['BACKUP_INTERVAL']:
+        scheduler.every(app.config['BACKUP_INTERVAL'], create_backup)
+    schedule_reminders(scheduler)
+
+    print("Running scheduled jobs (Ctrl+C to stop)...")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+@app.cli.command()
+@click.option('--fetch/--no-fetch', default=True, help='Download missing vendored libraries first')
+@click.option('--gzip-only', is_flag=True, help='Skip the .br variants (when brotli is not installed)')
+def build_assets(fetch, gzip_only):
+    """Fingerprint and precompress static assets into static/dist"""
+    if fetch:
+        for name in fetch_vendor_assets(app):
+            print(f"Fetched {name}")
+    try:
+        manifest = build_static_assets(app, gzip_only)
+    except AssetBuildError as e:
+        raise click.ClickException(str(e))
+    print(f"Built {len(manifest)} assets")
+
+@app.cli.group()
+def data_migrate():
+    """Chunked, resumable data migrations"""
+
+@data_migrate.command('list')
+def data_migrate_list():
+    """List data migrations and their progress"""
+    for name, migration in sorted(load_migrations().items()):
+        state = get_state(name)
+        if state is None:
+            status = 'pending'
+        elif state.finished_at:
+            status = f'done ({state.rows_done} rows)'
+        else:
+            status = f'in progress after key {state.last_key} ({state.rows_done} rows)'
+        print(f"{name}: {status} - {migration.description}")
+
+@data_migrate.command('run')
+@click.argument('name')
+@click.option('--chunk-size', type=int, help='Keys per chunk (default: the migration\'s own or DATA_MIGRATION_CHUNK_SIZE)')
+@click.option('--duty-cycle', type=click.FloatRange(0, 1, min_open=True), help='Fraction of time spent working, 0-1 (default: DATA_MIGRATION_DUTY_CYCLE)')
+@click.option('--max-chunks', type=int, help='Stop after this many chunks; run again to resume')
+def data_migrate_run(name, chunk_size, duty_cycle, max_chunks):
+    """Run or resume a data migration"""
+    migration_class = load_migrations().get(name)
+    if migration_class is None:
+        raise click.ClickException(f"Unknown data migration {name!r}")
+    try:
+        run_migration(migration_class(), chunk_size=chunk_size, duty_cycle=duty_cycle, max_chunks=max_chunks)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume from the last checkpoint")
+
+@data_migrate.command('reset')
+@click.argument('name')
+def data_migrate_reset(name):
+    """Forget a migration's checkpoint so it runs again from the start"""
+    reset_state(name)
+    print(f"Reset {name}")
+
 if __name__ == '__main__':
     app.run(debug=True)
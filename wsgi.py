@@ -0,0 +1,20 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With ``preload_app`` the master imports this module once: it builds the app,
+warms templates and statement caches (app/warmup.py) and freezes every
+object allocated so far out of the garbage collector's reach, so the forked
+workers share those pages instead of copying them on their first collection.
+Unlike run.py it registers no CLI commands.
+"""
+import gc
+import os
+from app import create_app
+from app.warmup import warm_up
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
+warm_up(app)
+
+gc.collect()
+gc.freeze()